@@ -0,0 +1,55 @@
+import json
+import random
+
+STRING_CARDINALITY = 0.1
+
+
+def load_schemas(meta_path, table_names=None):
+    with open(meta_path, 'r', encoding='utf-8') as file:
+        metadata = json.load(file)
+
+    if table_names:
+        return {table_name: metadata[table_name] for table_name in table_names}
+    return metadata
+
+
+def generate_value(rng, column, column_type, row_count):
+    if column_type == "int":
+        return rng.randrange(row_count)
+    if column_type == "bool":
+        return rng.random() < 0.5
+    # Строки повторяются, как имена или отделы в настоящих таблицах
+    return f"{column}_{rng.randrange(max(int(row_count * STRING_CARDINALITY), 1))}"
+
+
+def generate_rows(schema, row_count, seed=0):
+    rng = random.Random(seed)
+    columns = [column for column in schema if column != "ID"]
+    return [
+        {
+            "ID": record_id,
+            **{
+                column: generate_value(rng, column, schema[column], row_count)
+                for column in columns
+            },
+        }
+        for record_id in range(1, row_count + 1)
+    ]
+
+
+def format_cli_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def generate_insert_values(schema, count, row_count, seed=0):
+    rng = random.Random(seed)
+    columns = [column for column in schema if column != "ID"]
+    return [
+        [
+            format_cli_value(generate_value(rng, column, schema[column], row_count))
+            for column in columns
+        ]
+        for _ in range(count)
+    ]
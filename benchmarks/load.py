@@ -0,0 +1,183 @@
+"""Нагрузка на сервер: несколько клиентов шлют смесь чтений и записей.
+
+Сначала запустите сервер (project serve), затем из корня репозитория:
+
+    python -m benchmarks.load --clients 8 --duration 10 --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import cycle
+
+from src.primitive_db.constants import META_FILE, SERVER_HOST, SERVER_PORT
+
+from .datasets import generate_insert_values, generate_rows, load_schemas
+from .run import ROOT_DIR, get_environment, summarize
+
+INSERT_VALUES = 1000
+
+
+async def send_command(reader, writer, command):
+    writer.write(command.encode('utf-8') + b"\n")
+    await writer.drain()
+    header = await reader.readline()
+    if not header:
+        raise ConnectionError("сервер закрыл соединение")
+    return (await reader.readexactly(int(header))).decode('utf-8')
+
+
+def generate_requests(table_name, schema, row_count, write_ratio, seed):
+    rng = random.Random(seed)
+    inserts = cycle(generate_insert_values(schema, INSERT_VALUES, row_count, seed))
+    while True:
+        if rng.random() < write_ratio:
+            values = " ".join(f'"{value}"' for value in next(inserts))
+            yield "insert", f"insert {table_name} {values}"
+        else:
+            record_id = rng.randint(1, row_count)
+            yield "select", f'select {table_name} WHERE "ID = {record_id}"'
+
+
+async def run_client(host, port, requests, deadline, timings):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for kind, command in requests:
+            start_time = time.perf_counter()
+            if start_time >= deadline:
+                break
+            await send_command(reader, writer, command)
+            timings[kind].append(time.perf_counter() - start_time)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def prepare_table(host, port, table_name, schema, row_count, seed):
+    reader, writer = await asyncio.open_connection(host, port)
+    columns = " ".join(
+        f"{column}:{column_type}"
+        for column, column_type in schema.items()
+        if column != "ID"
+    )
+    with tempfile.NamedTemporaryFile(
+        'w', suffix=".jsonl", encoding='utf-8', delete=False
+    ) as file:
+        for row in generate_rows(schema, row_count, seed):
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    try:
+        await send_command(reader, writer, f"drop_table {table_name}")
+        await send_command(reader, writer, f"create_table {table_name} {columns}")
+        output = await send_command(
+            reader, writer, f'import {table_name} "{file.name}"'
+        )
+        await send_command(reader, writer, "stats reset")
+    finally:
+        os.remove(file.name)
+        writer.close()
+        await writer.wait_closed()
+    return output
+
+
+async def run_load(arguments, schema):
+    table_name = f"load_{arguments.table}"
+    output = await prepare_table(
+        arguments.host,
+        arguments.port,
+        table_name,
+        schema,
+        arguments.rows,
+        arguments.seed,
+    )
+    print(output.strip(), file=sys.stderr)
+
+    timings = {"select": [], "insert": []}
+    start_time = time.perf_counter()
+    deadline = start_time + arguments.duration
+    await asyncio.gather(*(
+        run_client(
+            arguments.host,
+            arguments.port,
+            generate_requests(
+                table_name,
+                schema,
+                arguments.rows,
+                arguments.write_ratio,
+                arguments.seed + client,
+            ),
+            deadline,
+            timings,
+        )
+        for client in range(arguments.clients)
+    ))
+    elapsed = time.perf_counter() - start_time
+
+    requests = sum(len(kind_timings) for kind_timings in timings.values())
+    return {
+        "clients": arguments.clients,
+        "rows": arguments.rows,
+        "write_ratio": arguments.write_ratio,
+        "seconds": elapsed,
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "operations": {
+            kind: summarize(kind_timings)
+            for kind, kind_timings in timings.items()
+            if kind_timings
+        },
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Нагрузка на сервер")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунды")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument(
+        "--write-ratio",
+        type=float,
+        default=0.1,
+        help="доля вставок среди запросов (остальное - выборки по ID)",
+    )
+    parser.add_argument(
+        "--table",
+        default="employees",
+        help="схема из db_meta.json; нагрузка идет на таблицу load_<схема>",
+    )
+    parser.add_argument(
+        "--meta",
+        default=os.path.join(ROOT_DIR, META_FILE),
+        help="файл метаданных со схемами таблиц",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    schema = load_schemas(arguments.meta, [arguments.table])[arguments.table]
+    try:
+        results = asyncio.run(run_load(arguments, schema))
+    except OSError as error:
+        print(f"Ошибка: Сервер недоступен - {error}", file=sys.stderr)
+        sys.exit(1)
+
+    report = {"environment": get_environment(), "results": results}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
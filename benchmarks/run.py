@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Замеры CRUD-операций на синтетических таблицах.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.run --sizes 1000 100000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from src.primitive_db.cache import table_cache
+from src.primitive_db.constants import META_FILE
+from src.primitive_db.database import Database
+from src.primitive_db.utils import (
+    get_storage_paths,
+    load_table_data,
+    load_table_indexes,
+    save_metadata,
+    save_table_data,
+)
+
+from .datasets import generate_insert_values, generate_rows, load_schemas
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 100000, 1000000]
+INDEXED_RUNS = 100
+# Сканирующие операции повторяются, пока суммарно не просмотрят столько строк
+SCAN_ROWS_BUDGET = 1000000
+MIN_SCAN_RUNS = 3
+INSERT_RUNS = 200
+BATCH_INSERT_ROWS = 10000
+MUTATION_RUNS = 20
+
+
+def summarize(timings, rows=None):
+    timings = sorted(timings)
+    total = sum(timings)
+    summary = {
+        "runs": len(timings),
+        "total_seconds": total,
+        "mean_ms": total / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000,
+        "max_ms": timings[-1] * 1000,
+        "ops_per_second": len(timings) / total if total else None,
+    }
+    if rows is not None:
+        summary["rows_per_second"] = rows / total if total else None
+    return summary
+
+
+def measure(operation, arguments):
+    timings = []
+    for argument in arguments:
+        start_time = time.perf_counter()
+        operation(argument)
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def get_scan_runs(row_count):
+    return max(MIN_SCAN_RUNS, min(INDEXED_RUNS, SCAN_ROWS_BUDGET // row_count))
+
+
+def find_column(schema, column_type):
+    for column, other_type in schema.items():
+        if column != "ID" and other_type == column_type:
+            return column
+    return None
+
+
+def run_select(database, table_name, where):
+    return list(database.select(table_name, where))
+
+
+def benchmark_table(database, table_name, schema, row_count, seed):
+    rng = random.Random(seed)
+    save_metadata({table_name: schema})
+    rows = generate_rows(schema, row_count, seed)
+    results = {}
+
+    start_time = time.perf_counter()
+    save_table_data(table_name, rows)
+    results["save"] = summarize([time.perf_counter() - start_time], row_count)
+    results["save"]["file_bytes"] = os.path.getsize(
+        get_storage_paths(table_name)["json"]
+    )
+
+    table_cache.clear()
+    start_time = time.perf_counter()
+    load_table_data(table_name)
+    results["load"] = summarize([time.perf_counter() - start_time], row_count)
+    start_time = time.perf_counter()
+    load_table_indexes(table_name)
+    results["load_indexes"] = summarize([time.perf_counter() - start_time])
+
+    record_ids = [rng.randint(1, row_count) for _ in range(INDEXED_RUNS)]
+    results["select_point_id"] = summarize(measure(
+        lambda where: run_select(database, table_name, where),
+        [f"ID = {record_id}" for record_id in record_ids],
+    ))
+
+    scan_runs = get_scan_runs(row_count)
+    str_column = find_column(schema, "str")
+    if str_column is not None:
+        values = [rng.choice(rows)[str_column] for _ in range(scan_runs)]
+        results["select_point_scan"] = summarize(measure(
+            lambda where: run_select(database, table_name, where),
+            [f"{str_column} = {value}" for value in values],
+        ))
+
+    int_column = find_column(schema, "int")
+    if int_column is not None:
+        # Порог отсекает около 1% строк
+        threshold = sorted(row[int_column] for row in rows)[int(row_count * 0.99)]
+        where_clause = f"{int_column} > {threshold}"
+        results["select_range"] = summarize(measure(
+            lambda where: run_select(database, table_name, where),
+            [where_clause] * scan_runs,
+        ))
+
+    insert_rows = generate_insert_values(schema, INSERT_RUNS, row_count, seed)
+    results["insert"] = summarize(measure(
+        lambda values: database.insert(table_name, values), insert_rows
+    ))
+
+    batch_rows = generate_insert_values(
+        schema, min(row_count, BATCH_INSERT_ROWS), row_count, seed
+    )
+    start_time = time.perf_counter()
+    database.insert_many(table_name, batch_rows)
+    results["insert_batch"] = summarize(
+        [time.perf_counter() - start_time], len(batch_rows)
+    )
+
+    mutation_ids = rng.sample(range(1, row_count + 1), min(MUTATION_RUNS, row_count))
+    set_column = int_column or str_column
+    if set_column is not None:
+        set_clause = f"{set_column}=1"
+        results["update_point"] = summarize(measure(
+            lambda where: database.update(table_name, set_clause, where),
+            [f"ID = {record_id}" for record_id in mutation_ids],
+        ))
+
+    results["delete_point"] = summarize(measure(
+        lambda where: database.delete(table_name, where),
+        [f"ID = {record_id}" for record_id in mutation_ids],
+    ))
+    return results
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment():
+    return {
+        "revision": get_git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Замеры CRUD-операций")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="размеры таблиц в строках (по умолчанию 1000 100000 1000000)",
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        help="таблицы из db_meta.json (по умолчанию все)",
+    )
+    parser.add_argument(
+        "--meta",
+        default=os.path.join(ROOT_DIR, META_FILE),
+        help="файл метаданных со схемами таблиц",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    schemas = load_schemas(arguments.meta, arguments.tables)
+    report = {"environment": get_environment(), "results": []}
+
+    for table_name, schema in schemas.items():
+        for row_count in arguments.sizes:
+            print(f"{table_name}: {row_count} строк...", file=sys.stderr)
+            # Каждый замер идет в чистом каталоге данных
+            with tempfile.TemporaryDirectory() as work_dir:
+                table_cache.clear()
+                with Database(work_dir) as database:
+                    operations = benchmark_table(
+                        database, table_name, schema, row_count, arguments.seed
+                    )
+            report["results"].append({
+                "table": table_name,
+                "rows": row_count,
+                "operations": operations,
+            })
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
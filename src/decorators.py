@@ -2,7 +2,8 @@ import functools
 import time
 from typing import Any, Callable
 
-import prompt
+from .primitive_db.errors import TransactionError
+from .primitive_db.metrics import metrics
 
 
 def handle_db_errors(func: Callable) -> Callable:
@@ -10,6 +11,9 @@ def handle_db_errors(func: Callable) -> Callable:
     def wrapper(*args, **kwargs) -> Any:
         try:
             return func(*args, **kwargs)
+        except TransactionError as e:
+            print(e)
+            return None
         except KeyError as e:
             print(f"Ошибка: Обращение к несуществующему ключу - {e}")
             return None
@@ -25,10 +29,21 @@ def handle_db_errors(func: Callable) -> Callable:
     return wrapper
 
 
+confirmation_settings = {"assume_yes": False}
+
+
+def set_assume_yes(value: bool) -> None:
+    confirmation_settings["assume_yes"] = value
+
+
 def confirm_action(action_name: str) -> Callable:
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
+            if confirmation_settings["assume_yes"]:
+                return func(*args, **kwargs)
+            import prompt
+
             message = f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
             confirmation = prompt.string(message)
             if confirmation.lower() != 'y':
@@ -40,14 +55,21 @@ def confirm_action(action_name: str) -> Callable:
 
 
 def log_time(func: Callable) -> Callable:
+    # Время функции учитывается отдельно от времени команды, вызвавшей ее.
+    # Для функций, возвращающих ленивый итератор, замер покрыл бы только его
+    # создание - их время входит во время команды
+    operation = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs) -> Any:
-        start_time = time.monotonic()
-        result = func(*args, **kwargs)
-        end_time = time.monotonic()
-        execution_time = end_time - start_time
-        print(f"Функция {func.__name__} выполнилась за {execution_time:.3f} секунд.")
-        return result
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe(operation, time.perf_counter() - start_time)
     return wrapper
 
 
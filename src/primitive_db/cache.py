@@ -0,0 +1,104 @@
+import os
+import sys
+from collections import OrderedDict
+
+from .constants import CACHE_MAX_BYTES, CACHE_MAX_BYTES_ENV, CACHE_SAMPLE_ROWS
+
+
+class TableCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, signature):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != signature:
+            self.misses += 1
+            if entry is not None:
+                self.invalidate(key)
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, signature, value, size):
+        self.invalidate(key)
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = (signature, value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def refresh(self, key, old_signature, new_signature):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        if entry[0] != old_signature:
+            self.invalidate(key)
+            return
+        self.entries[key] = (new_signature, entry[1], entry[2])
+
+    def invalidate(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def get_file_signature(*file_paths):
+    signature = []
+    for file_path in file_paths:
+        try:
+            file_stat = os.stat(file_path)
+            signature.append((file_stat.st_mtime_ns, file_stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def estimate_record_size(record):
+    size = sys.getsizeof(record)
+    for value in record.values():
+        size += sys.getsizeof(value)
+    return size
+
+
+def estimate_rows_size(rows):
+    if not rows:
+        return sys.getsizeof(rows)
+
+    sample = rows[:CACHE_SAMPLE_ROWS]
+    row_size = sum(estimate_record_size(record) for record in sample) / len(sample)
+    return sys.getsizeof(rows) + int(row_size * len(rows))
+
+
+def get_cache_limit():
+    try:
+        return int(os.environ.get(CACHE_MAX_BYTES_ENV, CACHE_MAX_BYTES))
+    except ValueError:
+        return CACHE_MAX_BYTES
+
+
+table_cache = TableCache(get_cache_limit())
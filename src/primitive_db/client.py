@@ -0,0 +1,66 @@
+import socket
+import sys
+
+
+class Client:
+    # Синхронный клиент сервера: execute отправляет команду и возвращает
+    # ее вывод строкой
+    def __init__(self, host, port):
+        self.connection = socket.create_connection((host, port))
+        self.file = self.connection.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def execute(self, command):
+        self.file.write(command.replace("\n", " ").encode('utf-8') + b"\n")
+        self.file.flush()
+        header = self.file.readline()
+        if not header:
+            raise ConnectionError("сервер закрыл соединение")
+        return self.file.read(int(header)).decode('utf-8')
+
+    def close(self):
+        self.file.close()
+        self.connection.close()
+
+
+def connect(host, port):
+    try:
+        client = Client(host, port)
+    except OSError as error:
+        print(f"Ошибка: Не удалось подключиться к {host}:{port} - {error}")
+        return
+
+    with client:
+        if sys.stdin.isatty():
+            lines = read_commands(f"{host}:{port}> ")
+        else:
+            lines = sys.stdin
+
+        for line in lines:
+            line = line.strip().rstrip(";").strip()
+            if not line or line.startswith(("#", "--")):
+                continue
+
+            try:
+                print(client.execute(line), end="")
+            except (OSError, ValueError) as error:
+                print(f"Ошибка: Соединение с сервером потеряно - {error}")
+                break
+            if line.split()[0].lower() == "exit":
+                break
+
+
+def read_commands(message):
+    import prompt
+
+    while True:
+        try:
+            yield prompt.string(message)
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
@@ -0,0 +1,70 @@
+import gc
+import json
+from contextlib import contextmanager
+from itertools import repeat
+
+try:
+    import orjson
+except ImportError:
+    # orjson необязателен - без него используется стандартный json
+    orjson = None
+
+
+def encode(value):
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # Целые вне 64 бит orjson не кодирует - их пишет стандартный json
+            pass
+    return encode_json(value).encode('utf-8')
+
+
+def encode_text(value):
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            pass
+    return encode_json(value)
+
+
+def encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(data):
+    # Ошибки разбора в обоих случаях - подклассы json.JSONDecodeError
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_rows(columns, records):
+    # Имена столбцов записываются один раз, строки - массивами значений
+    return encode({
+        "columns": columns,
+        "rows": [[record[column] for column in columns] for record in records],
+    })
+
+
+def decode_rows(snapshot):
+    # Снимки старого формата - список словарей - читаются как есть
+    if isinstance(snapshot, list):
+        return snapshot
+    columns = repeat(snapshot["columns"])
+    with paused_gc():
+        return list(map(dict, map(zip, columns, snapshot["rows"])))
+
+
+@contextmanager
+def paused_gc():
+    # Сотни тысяч новых словарей запускают сборку мусора снова и снова,
+    # хотя циклических ссылок в строках таблицы нет
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,170 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from .constants import COLUMNAR_MAGIC
+
+HEADER_FORMAT = "<8sQI"
+COLUMN_FORMAT = "<H{}sBQQ"
+TYPE_CODES = {"int": 0, "bool": 1, "str": 2}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+class StrColumn:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_values(cls, values):
+        offsets = array('q', [0])
+        blob = bytearray()
+        for value in values:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+        return cls(offsets, blob)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, position):
+        return bytes(self.blob[self.offsets[position]:self.offsets[position + 1]])
+
+    def __getitem__(self, position):
+        return self.raw(position).decode('utf-8')
+
+    def raw_values(self):
+        offsets = self.offsets
+        blob = self.blob
+        for position in range(len(offsets) - 1):
+            yield bytes(blob[offsets[position]:offsets[position + 1]])
+
+    def to_bytes(self):
+        return self.offsets.tobytes() + bytes(self.blob)
+
+
+class ColumnarTable:
+    def __init__(self, schema, row_count, columns, source=None):
+        self.schema = schema
+        self.row_count = row_count
+        self.columns = columns
+        self.source = source
+
+    @classmethod
+    def from_records(cls, schema, records):
+        columns = {}
+        for column, column_type in schema.items():
+            values = [record[column] for record in records]
+            if column_type == "int":
+                columns[column] = array('q', values)
+            elif column_type == "bool":
+                columns[column] = array('b', values)
+            else:
+                columns[column] = StrColumn.from_values(values)
+        return cls(schema, len(records), columns)
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(source)
+        magic, row_count, column_count = struct.unpack_from(HEADER_FORMAT, source, 0)
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError(f'файл "{file_path}" не является колоночной таблицей')
+
+        position = struct.calcsize(HEADER_FORMAT)
+        schema = {}
+        columns = {}
+        for _ in range(column_count):
+            (name_length,) = struct.unpack_from("<H", source, position)
+            column_format = COLUMN_FORMAT.format(name_length)
+            _, name, type_code, offset, length = struct.unpack_from(
+                column_format, source, position
+            )
+            position += struct.calcsize(column_format)
+
+            column = name.decode('utf-8')
+            column_type = TYPE_NAMES[type_code]
+            section = view[offset:offset + length]
+            schema[column] = column_type
+            if column_type == "int":
+                columns[column] = section.cast('q')
+            elif column_type == "bool":
+                columns[column] = section.cast('b')
+            else:
+                offsets_length = (row_count + 1) * 8
+                columns[column] = StrColumn(
+                    section[:offsets_length].cast('q'), section[offsets_length:]
+                )
+
+        return cls(schema, row_count, columns, source)
+
+    def to_bytes(self):
+        sections = []
+        for column, column_type in self.schema.items():
+            data = self.columns[column]
+            if column_type == "str":
+                sections.append(data.to_bytes())
+            else:
+                sections.append(data.tobytes())
+
+        header = struct.pack(
+            HEADER_FORMAT, COLUMNAR_MAGIC, self.row_count, len(self.schema)
+        )
+        descriptors_size = sum(
+            struct.calcsize(COLUMN_FORMAT.format(len(column.encode('utf-8'))))
+            for column in self.schema
+        )
+
+        offset = align(len(header) + descriptors_size)
+        descriptors = b""
+        layout = []
+        for (column, column_type), section in zip(self.schema.items(), sections):
+            name = column.encode('utf-8')
+            descriptors += struct.pack(
+                COLUMN_FORMAT.format(len(name)),
+                len(name),
+                name,
+                TYPE_CODES[column_type],
+                offset,
+                len(section),
+            )
+            layout.append((offset, section))
+            offset = align(offset + len(section))
+
+        output = bytearray(header + descriptors)
+        for offset, section in layout:
+            output += b"\0" * (offset - len(output))
+            output += section
+        return bytes(output)
+
+    def memory_size(self):
+        if self.source is not None:
+            return sys.getsizeof(self)
+
+        size = 0
+        for column, column_type in self.schema.items():
+            data = self.columns[column]
+            if column_type == "str":
+                size += data.offsets.itemsize * len(data.offsets) + len(data.blob)
+            else:
+                size += data.itemsize * len(data)
+        return size
+
+    def get_value(self, column, position):
+        value = self.columns[column][position]
+        if self.schema[column] == "bool":
+            return bool(value)
+        return value
+
+    def get_record(self, position):
+        return {column: self.get_value(column, position) for column in self.schema}
+
+    def to_records(self):
+        return [self.get_record(position) for position in range(self.row_count)]
+
+
+def align(offset):
+    return (offset + 7) // 8 * 8
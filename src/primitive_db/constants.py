@@ -1,6 +1,10 @@
 META_FILE = "db_meta.json"
 DATA_DIR = "data"
 SUPPORTED_TYPES = ["int", "str", "bool"]
+# Целые хранятся в двоичных форматах как int64, а orjson не кодирует
+# числа вне этого диапазона
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
 ERROR_TABLE_EXISTS = 'Ошибка: Таблица "{}" уже существует.'
 ERROR_TABLE_NOT_EXISTS = 'Ошибка: Таблица "{}" не существует.'
 ERROR_COLUMN_COUNT = "Ошибка: Ожидается {} значений, получено {}."
@@ -10,6 +14,100 @@ ERROR_INVALID_DATA_TYPE = 'Некорректный тип данных: "{}". 
 WHERE_PATTERN = "column = value"
 SET_PATTERN = "column = value"
 COLUMN_PATTERN = r'^[a-zA-Z_][a-zA-Z0-9_]*:(int|str|bool)$'
+# Имя таблицы становится частью имен файлов в каталоге данных
+TABLE_NAME_PATTERN = r'[a-zA-Z_][a-zA-Z0-9_]*'
+ERROR_INVALID_TABLE_NAME = (
+    'Ошибка: Некорректное имя таблицы "{}".'
+    " Допустимы латинские буквы, цифры и _, первым символом - не цифра."
+)
 TRUE_VALUES = ['true', '1']
 FALSE_VALUES = ['false', '0']
 VALID_BOOLEAN_VALUES = TRUE_VALUES + FALSE_VALUES
+TABLE_EXTENSION = ".json"
+LOG_EXTENSION = ".log"
+LOG_COMPACTION_SIZE = 1024 * 1024
+LOG_INSERT = "insert"
+LOG_UPDATE = "update"
+LOG_DELETE = "delete"
+INDEX_EXTENSION = ".idx"
+INDEX_OPERATORS = ["=", ">", "<", ">=", "<="]
+LOGIC_KEYWORDS = ["AND", "OR", "NOT", "(", ")"]
+ERROR_WHERE_FORMAT = (
+    "Ошибка: Некорректный формат условия WHERE."
+    " Используйте: column оператор value [AND|OR|NOT ...]"
+)
+ERROR_JOIN_FORMAT = (
+    "Ошибка: Некорректное условие соединения."
+    " Используйте: JOIN <таблица> ON <таблица1>.<столбец> = <таблица2>.<столбец>"
+)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_BYTES_ENV = "PRIMITIVE_DB_CACHE_BYTES"
+CACHE_SAMPLE_ROWS = 32
+SEQUENCE_EXTENSION = ".seq"
+LOCK_EXTENSION = ".lock"
+# Сколько пакет или транзакция ждут блокировку таблицы, прежде чем
+# отказаться от нее (секунды)
+LOCK_WAIT_TIMEOUT = 5.0
+LOCK_RETRY_INTERVAL = 0.01
+JOURNAL_PREFIX = "transaction."
+JOURNAL_EXTENSION = ".journal"
+NON_TRANSACTIONAL_COMMANDS = [
+    "create_table",
+    "drop_table",
+    "create_index",
+    "convert_table",
+    "migrate",
+    "analyze",
+]
+PRIMARY_KEY = "ID"
+TRANSFER_FORMATS = [".csv", ".jsonl"]
+COLUMNAR_EXTENSION = ".col"
+COLUMNAR_MAGIC = b"PDBCOL1\0"
+PAGED_EXTENSION = ".tbl"
+PAGED_MAGIC = b"PDBPAGE1"
+PAGE_ROWS = 256
+STORAGE_FORMATS = ["json", "columnar", "paged"]
+DISPLAY_PAGE_ROWS = 50
+OUTPUT_FORMATS = ["table", "tsv", "jsonl"]
+SELECT_KEYWORDS = [
+    "JOIN",
+    "ON",
+    "WHERE",
+    "GROUP",
+    "ORDER",
+    "LIMIT",
+    "OFFSET",
+    "FORMAT",
+]
+AGGREGATE_FUNCTIONS = ["COUNT", "SUM", "AVG", "MIN", "MAX"]
+NUMERIC_AGGREGATES = ["SUM", "AVG"]
+GROUP_COMMIT_ENV = "PRIMITIVE_DB_GROUP_COMMIT"
+PARALLEL_WORKERS_ENV = "PRIMITIVE_DB_WORKERS"
+PARALLEL_SCAN_ROWS = 200000
+PARALLEL_SCAN_ROWS_ENV = "PRIMITIVE_DB_PARALLEL_ROWS"
+PARALLEL_CHUNKS_PER_WORKER = 4
+STATS_EXTENSION = ".stats"
+STATISTICS_KEY = "_statistics"
+HISTOGRAM_BUCKETS = 16
+RANGE_SELECTIVITY = 1 / 3
+INDEX_SCAN_RATIO = 0.3
+STATS_STALE_RATIO = 0.5
+METRICS_ENV = "PRIMITIVE_DB_METRICS"
+METRICS_COUNTERS = [
+    "rows_scanned",
+    "rows_returned",
+    "bytes_read",
+    "bytes_written",
+    "parse_time",
+]
+LATENCY_MIN_SECONDS = 1e-5
+LATENCY_BUCKETS_PER_OCTAVE = 4
+PROFILE_TOP_ENTRIES = 20
+JSON_COMPACT_ENV = "PRIMITIVE_DB_JSON_COMPACT"
+DELETE_IN_PLACE_ROWS = 16
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7432
+SERVER_FLUSH_INTERVAL = 0.05
+SERVER_FLUSH_ENTRIES = 1000
+# Импорт и экспорт читают и пишут произвольные пути на стороне сервера
+SERVER_DISABLED_COMMANDS = ["begin", "rollback", "import", "export"]
@@ -1,303 +1,974 @@
 #!/usr/bin/env python3
-from prettytable import PrettyTable
-
-from ..decorators import confirm_action, handle_db_errors, log_time
+import heapq
+import json
+import operator
+from bisect import bisect_left
+from itertools import chain, compress, islice, repeat
+
+from ..decorators import handle_db_errors, log_time
+from .cache import table_cache
 from .constants import (
-    ERROR_COLUMN_COUNT,
-    ERROR_INVALID_DATA_TYPE,
-    ERROR_INVALID_TYPE,
-    ERROR_INVALID_VALUE,
-    ERROR_TABLE_EXISTS,
+    DELETE_IN_PLACE_ROWS,
+    DISPLAY_PAGE_ROWS,
     ERROR_TABLE_NOT_EXISTS,
-    SUPPORTED_TYPES,
+    INDEX_OPERATORS,
+    INDEX_SCAN_RATIO,
+    INT_MAX,
+    INT_MIN,
+    NUMERIC_AGGREGATES,
+    PRIMARY_KEY,
+    STATISTICS_KEY,
+    STORAGE_FORMATS,
     VALID_BOOLEAN_VALUES,
 )
+from .index import ColumnIndex
+from .locks import get_lock_stats, table_lock
+from .metrics import metrics
+from .parallel import (
+    parallel_scan,
+    run_parallel_scan,
+    shared_scan,
+    should_scan_in_parallel,
+)
 from .utils import (
+    get_table_format,
+    list_index_columns,
     load_table_data,
+    load_table_indexes,
     save_table_data,
-    validate_column_definition,
-    validate_data_type,
+    save_table_index,
 )
 
+COMPARISON_OPERATORS = {
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+# Экранирование, как в формате TSV у PostgreSQL и ClickHouse
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
 
-@handle_db_errors
-def create_table(metadata, table_name, columns):
-    if table_name in metadata:
-        print(ERROR_TABLE_EXISTS.format(table_name))
-        return None
-
-    table_columns = {"ID": "int"}
 
-    for column_definition in columns:
-        if not validate_column_definition(column_definition):
-            print(ERROR_INVALID_VALUE.format(column_definition))
-            return None
-
-        column_name, column_type = column_definition.split(":")
-
-        if not validate_data_type(column_type):
-            supported_types_str = ", ".join(SUPPORTED_TYPES)
-            print(ERROR_INVALID_DATA_TYPE.format(column_type, supported_types_str))
-            return None
+def list_tables(metadata):
+    if not metadata:
+        print("В базе данных нет таблиц.")
+        return
 
-        table_columns[column_name] = column_type
+    print("Список таблиц:")
+    for table_name in metadata:
+        print(f"- {table_name}")
 
-    metadata[table_name] = table_columns
 
-    save_table_data(table_name, [])
+def show_stats():
+    cache_stats = table_cache.stats()
+    print("Статистика кэша таблиц:")
+    print(f"- попаданий: {cache_stats['hits']}")
+    print(f"- промахов: {cache_stats['misses']}")
+    print(f"- вытеснений: {cache_stats['evictions']}")
+    print(f"- записей в кэше: {cache_stats['entries']}")
+    print(f"- занято: {cache_stats['bytes']} из {cache_stats['max_bytes']} байт")
 
-    columns_str = ", ".join([f"{col}:{typ}" for col, typ in table_columns.items()])
-    print(f'Таблица "{table_name}" успешно создана со столбцами: {columns_str}')
+    lock_stats = get_lock_stats()
+    print("Статистика блокировок:")
+    for mode, mode_name in (("shared", "чтение"), ("exclusive", "запись")):
+        stats = lock_stats[mode]
+        msg = f"- {mode_name}: получено {stats['acquired']},"
+        msg += f" с ожиданием {stats['contended']},"
+        msg += f" ожидание {stats['wait_total']:.3f} с"
+        msg += f" (максимум {stats['wait_max']:.3f} с)"
+        print(msg)
 
-    return metadata
+    show_metrics()
 
 
-def list_tables(metadata):
-    if not metadata:
-        print("В базе данных нет таблиц.")
+def show_metrics():
+    if not metrics.enabled:
+        print("Сбор метрик выключен.")
+        return
+    if not metrics.operations:
+        print("Метрики операций пока не собраны.")
         return
 
-    print("Список таблиц:")
-    for table_name in metadata:
-        print(f"- {table_name}")
+    # prettytable импортируется только там, где таблица выводится:
+    # сценарии без вывода таблиц не платят за импорт при запуске
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = [
+        "Операция", "Таблица", "Вызовов", "p50, мс", "p95, мс", "p99, мс",
+        "Строк прочитано", "Строк выдано", "Байт прочитано", "Байт записано",
+        "Разбор, мс",
+    ]
+    for row in metrics.to_dict():
+        table.add_row([
+            row["operation"],
+            row["table"],
+            row["count"],
+            f"{row['p50_seconds'] * 1000:.3f}",
+            f"{row['p95_seconds'] * 1000:.3f}",
+            f"{row['p99_seconds'] * 1000:.3f}",
+            row["rows_scanned"],
+            row["rows_returned"],
+            row["bytes_read"],
+            row["bytes_written"],
+            f"{row['parse_time'] * 1000:.3f}",
+        ])
+    print("Метрики операций:")
+    print(table)
 
 
 @handle_db_errors
-@confirm_action("удаление таблицы")
-def drop_table(metadata, table_name):
+def create_index(metadata, table_name, column):
     if table_name not in metadata:
         print(ERROR_TABLE_NOT_EXISTS.format(table_name))
         return None
 
-    del metadata[table_name]
-    print(f'Таблица "{table_name}" успешно удалена.')
+    table_schema = metadata[table_name]
+    if column not in table_schema:
+        print(f'Ошибка: Столбец "{column}" не существует в таблице "{table_name}".')
+        return None
+
+    if column == PRIMARY_KEY or column in list_index_columns(table_name):
+        print(f'Индекс по столбцу "{column}" уже существует.')
+        return None
 
-    return metadata
+    table_data = load_table_data(table_name)
+    index = ColumnIndex.build(column, table_schema[column], table_data)
+    save_table_index(table_name, index)
+    # Индекс соответствует снимку без журнала, поэтому журнал сворачивается
+    save_table_data(table_name, table_data)
+
+    print(f'Индекс по столбцу "{column}" таблицы "{table_name}" успешно создан.')
+    return index
 
 
 @handle_db_errors
-@log_time
-def insert(metadata, table_name, values):
+def convert_table(metadata, table_name, storage_format):
     if table_name not in metadata:
         print(ERROR_TABLE_NOT_EXISTS.format(table_name))
         return None
 
-    table_schema = metadata[table_name]
-    expected_columns = list(table_schema.keys())[1:]
-    expected_count = len(expected_columns)
-
-    if len(values) != expected_count:
-        print(ERROR_COLUMN_COUNT.format(expected_count, len(values)))
+    if storage_format not in STORAGE_FORMATS:
+        formats_str = ", ".join(STORAGE_FORMATS)
+        msg = f'Ошибка: Неизвестный формат хранения "{storage_format}".'
+        msg += f" Поддерживаемые форматы: {formats_str}."
+        print(msg)
         return None
 
     table_data = load_table_data(table_name)
+    save_table_data(table_name, table_data, storage_format)
 
-    validated_values = []
-    for index, value in enumerate(values):
-        column_name = expected_columns[index]
-        expected_type = table_schema[column_name]
+    print(f'Таблица "{table_name}" переведена в формат "{storage_format}".')
+    return storage_format
+
+
+@handle_db_errors
+def migrate_tables(metadata, table_names):
+    table_names = table_names or list(metadata)
+    migrated_count = 0
+
+    for table_name in table_names:
+        if table_name not in metadata:
+            print(ERROR_TABLE_NOT_EXISTS.format(table_name))
+            continue
+        if get_table_format(table_name) != "json":
+            continue
+
+        with table_lock(table_name, exclusive=True):
+            save_table_data(table_name, load_table_data(table_name), "paged")
+        migrated_count += 1
+        print(f'Таблица "{table_name}" переведена в страничный формат.')
+
+    print(f'Перенесено таблиц: {migrated_count}.')
+    return migrated_count
 
-        if not validate_value_type(value, expected_type):
-            print(ERROR_INVALID_TYPE.format(column_name, expected_type))
-            return None
 
-        validated_values.append(convert_value(value, expected_type))
+def get_condition_column(condition):
+    for column in condition:
+        if column != "_operator":
+            return column
+    return None
 
-    if table_data:
-        new_id = max(item['ID'] for item in table_data) + 1
+
+def get_and_conditions(where_clause):
+    if where_clause.get("_logic") == "AND":
+        conditions = where_clause["_conditions"]
     else:
-        new_id = 1
+        conditions = [where_clause]
+    return [condition for condition in conditions if "_logic" not in condition]
+
+
+def get_indexed_conditions(where_clause, indexes):
+    conditions = []
+    for condition in get_and_conditions(where_clause):
+        column = get_condition_column(condition)
+        operator = condition.get("_operator", "=")
+        if column not in indexes or column == STATISTICS_KEY:
+            continue
+        if operator not in INDEX_OPERATORS:
+            continue
+        if column == PRIMARY_KEY and operator != "=":
+            continue
+        conditions.append((column, operator, condition[column]))
+    return conditions
+
+
+def plan_query(where_clause, indexes, row_count):
+    plan = {
+        "access": "scan",
+        "row_count": row_count,
+        "estimated_rows": row_count,
+        "conditions": [],
+    }
+    if where_clause is None:
+        return plan
+
+    indexes = indexes or {}
+    statistics = indexes.get(STATISTICS_KEY)
+    if statistics is not None and statistics.is_stale():
+        statistics = None
+    best = None
+    for column, condition_operator, value in get_indexed_conditions(
+        where_clause, indexes
+    ):
+        estimated_rows = None
+        if statistics is not None:
+            condition_value = convert_value(value, indexes[column].column_type)
+            estimated_rows = statistics.estimate_rows(
+                column, condition_operator, condition_value
+            )
+
+        condition = (column, condition_operator, value, estimated_rows)
+        plan["conditions"].append(condition)
+        if best is None or (
+            estimated_rows is not None and estimated_rows < best[3]
+        ):
+            best = condition
+
+    if best is not None:
+        # Без статистики индекс выбирается всегда. Со статистикой
+        # неселективный индекс проигрывает полному проходу: выборка строк
+        # по списку ID дороже фильтра по всей таблице
+        estimated_rows = best[3]
+        if estimated_rows is None or estimated_rows <= row_count * INDEX_SCAN_RATIO:
+            plan.update(
+                access="index",
+                column=best[0],
+                operator=best[1],
+                value=best[2],
+                estimated_rows=estimated_rows,
+            )
+            return plan
+
+    if should_scan_in_parallel(row_count):
+        plan["access"] = "parallel_scan"
+    return plan
+
+
+def find_indexed_records(table_data, plan, indexes):
+    index = indexes[plan["column"]]
+    condition_value = convert_value(plan["value"], index.column_type)
+    matched_ids = index.lookup(plan["operator"], condition_value)
+
+    primary_index = indexes.get(PRIMARY_KEY)
+    if primary_index is not None:
+        return primary_index.get_records(sorted(matched_ids))
+
+    matched_ids = set(matched_ids)
+    return [record for record in table_data if record['ID'] in matched_ids]
+
+
+def compile_where(where_clause, sample_record):
+    logic = where_clause.get("_logic")
+    if logic is not None:
+        predicates = [
+            compile_where(condition, sample_record)
+            for condition in where_clause["_conditions"]
+        ]
+        if logic == "NOT":
+            inner = predicates[0]
+            return lambda record: not inner(record)
+
+        predicate = predicates[0]
+        for next_predicate in predicates[1:]:
+            if logic == "AND":
+                predicate = combine_and(predicate, next_predicate)
+            else:
+                predicate = combine_or(predicate, next_predicate)
+        return predicate
+
+    column = get_condition_column(where_clause)
+    if column not in sample_record:
+        return lambda record: False
+
+    compare = COMPARISON_OPERATORS[where_clause.get("_operator", "=")]
+    column_type = type(sample_record[column]).__name__
+    condition_value = convert_value(where_clause[column], column_type)
+
+    def predicate(record):
+        return compare(record[column], condition_value)
+
+    return predicate
+
+
+def combine_and(first, second):
+    return lambda record: first(record) and second(record)
+
+
+def combine_or(first, second):
+    return lambda record: first(record) or second(record)
+
+
+def iter_filtered_records(table_data, where_clause, indexes=None):
+    if not table_data:
+        return iter([])
 
-    new_record = {'ID': new_id}
-    for index, column_name in enumerate(expected_columns):
-        new_record[column_name] = validated_values[index]
+    if where_clause is None:
+        metrics.add("rows_scanned", len(table_data))
+        return iter(table_data)
+
+    plan = plan_query(where_clause, indexes, len(table_data))
+    if plan["access"] == "index":
+        candidates = find_indexed_records(table_data, plan, indexes)
+        metrics.add("rows_scanned", len(candidates))
+    elif plan["access"] == "parallel_scan":
+        metrics.add("rows_scanned", len(table_data))
+        positions = run_parallel_scan(
+            scan_records_chunk, table_data, where_clause, len(table_data)
+        )
+        return map(table_data.__getitem__, positions)
+    else:
+        candidates = table_data
+        metrics.add("rows_scanned", len(table_data))
 
-    table_data.append(new_record)
-    save_table_data(table_name, table_data)
+    predicate = compile_where(where_clause, table_data[0])
+    return filter(predicate, candidates)
 
-    print(f'Запись успешно добавлена в таблицу "{table_name}" с ID {new_id}.')
-    return table_data
 
+def scan_records_chunk(bounds):
+    # Выполняется в рабочем процессе, таблица унаследована через fork
+    table_data = shared_scan["source"]
+    start, stop = bounds
+    predicate = compile_where(shared_scan["where"], table_data[0])
+    return list(compress(range(start, stop), map(predicate, table_data[start:stop])))
 
-@handle_db_errors
-@log_time
-def select(table_data, where_clause=None):
+
+def filter_records(table_data, where_clause, indexes=None):
+    return list(iter_filtered_records(table_data, where_clause, indexes))
+
+
+def select(table_data, where_clause=None, indexes=None):
+    return iter_filtered_records(table_data, where_clause, indexes)
+
+
+def get_where_columns(where_clause):
+    if "_logic" in where_clause:
+        return [
+            column
+            for condition in where_clause["_conditions"]
+            for column in get_where_columns(condition)
+        ]
+    return [get_condition_column(where_clause)]
+
+
+def combine_conditions(conditions):
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"_logic": "AND", "_conditions": conditions}
+
+
+def unqualify_condition(condition):
+    if "_logic" in condition:
+        return {
+            "_logic": condition["_logic"],
+            "_conditions": [
+                unqualify_condition(inner) for inner in condition["_conditions"]
+            ],
+        }
+    column = get_condition_column(condition)
+    return {
+        column.split(".", 1)[1]: condition[column],
+        "_operator": condition.get("_operator", "="),
+    }
+
+
+def split_join_where(where_clause, table_names):
+    # Условия AND, которые касаются одной таблицы, проверяются до соединения
+    # и могут использовать ее индексы; остальные - на соединенных строках
+    pushed = {table_name: [] for table_name in table_names}
+    if where_clause is None:
+        return dict.fromkeys(table_names), None
+
+    if where_clause.get("_logic") == "AND":
+        conditions = where_clause["_conditions"]
+    else:
+        conditions = [where_clause]
+
+    remaining = []
+    for condition in conditions:
+        tables = {column.split(".", 1)[0] for column in get_where_columns(condition)}
+        if len(tables) == 1 and tables <= pushed.keys():
+            pushed[tables.pop()].append(unqualify_condition(condition))
+        else:
+            remaining.append(condition)
+
+    pushed = {
+        table_name: combine_conditions(conditions)
+        for table_name, conditions in pushed.items()
+    }
+    return pushed, combine_conditions(remaining)
+
+
+def build_join_lookup(records, column):
+    # Хэш-таблица строится за один проход по меньшей таблице
+    buckets = {}
+    for record in records:
+        buckets.setdefault(record[column], []).append(record)
+    return lambda value: buckets.get(value, ())
+
+
+def index_join_lookup(indexes, column, where_clause=None):
+    # Готовый индекс по столбцу соединения заменяет хэш-таблицу
+    index = indexes[column]
+    primary_index = indexes[PRIMARY_KEY]
+    predicate = None
+    if where_clause is not None and primary_index.rows:
+        sample_record = next(iter(primary_index.rows.values()))
+        predicate = compile_where(where_clause, sample_record)
+
+    def lookup(value):
+        records = primary_index.get_records(index.lookup("=", value))
+        if predicate is None:
+            return records
+        return filter(predicate, records)
+
+    return lookup
+
+
+def join(lookup, probe_records, probe_column):
+    # Строки большей таблицы читаются потоком, каждая ищется в хэш-таблице
+    for probe_record in probe_records:
+        for record in lookup(probe_record[probe_column]):
+            yield record, probe_record
+
+
+def get_order_access(where_clause, indexes, column, row_count):
+    # Строки JSON-таблицы обычно лежат по возрастанию ID (первичный индекс
+    # знает, так ли это), а отсортированный индекс хранит порядок по своему
+    # столбцу - их можно читать без сортировки.
+    # Исключение - селективное условие с индексом: дешевле отобрать по нему
+    # немногие строки и отсортировать их
+    if indexes is None or column == STATISTICS_KEY:
+        return "sort"
+    if column != PRIMARY_KEY and column not in indexes:
+        return "sort"
+    if column == PRIMARY_KEY and not indexes[PRIMARY_KEY].ordered:
+        return "sort"
+    if plan_query(where_clause, indexes, row_count)["access"] == "index":
+        return "sort"
+    return "index"
+
+
+def iter_ordered_records(table_data, where_clause, indexes, column, descending):
     if not table_data:
+        return iter([])
+
+    if column == PRIMARY_KEY:
+        records = reversed(table_data) if descending else iter(table_data)
+    else:
+        record_ids = indexes[column].sorted_ids
+        if descending:
+            record_ids = reversed(record_ids)
+        records = map(indexes[PRIMARY_KEY].rows.__getitem__, record_ids)
+
+    if where_clause is None:
+        return records
+    return filter(compile_where(where_clause, table_data[0]), records)
+
+
+def order_records(records, column, descending=False, count=None):
+    # С LIMIT в памяти только куча из count строк: O(n log k) вместо
+    # сортировки всего результата
+    key = operator.itemgetter(column)
+    if count is None:
+        return iter(sorted(records, key=key, reverse=descending))
+    if descending:
+        return iter(heapq.nlargest(count, records, key=key))
+    return iter(heapq.nsmallest(count, records, key=key))
+
+
+def find_columnar_positions(columnar_table, where_clause, candidates):
+    logic = where_clause.get("_logic")
+    if logic == "AND":
+        for condition in where_clause["_conditions"]:
+            candidates = find_columnar_positions(columnar_table, condition, candidates)
+        return candidates
+    if logic == "OR":
+        matched = set()
+        for condition in where_clause["_conditions"]:
+            matched.update(
+                find_columnar_positions(columnar_table, condition, candidates)
+            )
+        return sorted(matched)
+    if logic == "NOT":
+        excluded = set(find_columnar_positions(
+            columnar_table, where_clause["_conditions"][0], candidates
+        ))
+        return [position for position in candidates if position not in excluded]
+
+    column = get_condition_column(where_clause)
+    if column not in columnar_table.schema:
         return []
 
+    compare = COMPARISON_OPERATORS[where_clause.get("_operator", "=")]
+    column_type = columnar_table.schema[column]
+    condition_value = convert_value(where_clause[column], column_type)
+    column_data = columnar_table.columns[column]
+    is_full_scan = len(candidates) == columnar_table.row_count
+
+    if column_type == "str":
+        # UTF-8 сохраняет порядок символов, поэтому сравниваются сырые байты
+        condition_value = condition_value.encode('utf-8')
+        if is_full_scan:
+            values = column_data.raw_values()
+        else:
+            values = map(column_data.raw, candidates)
+    else:
+        if column_type == "bool":
+            condition_value = int(condition_value)
+        values = iter(column_data) if is_full_scan else map(
+            column_data.__getitem__, candidates
+        )
+
+    return list(compress(candidates, map(compare, values, repeat(condition_value))))
+
+
+def select_columnar(columnar_table, where_clause=None):
+    positions = range(columnar_table.row_count)
+    metrics.add("rows_scanned", columnar_table.row_count)
+    if where_clause is not None:
+        positions = find_columnar_positions(columnar_table, where_clause, positions)
+    return map(columnar_table.get_record, positions)
+
+
+def select_paged(paged_table, where_clause=None):
     if where_clause is None:
-        return table_data
+        metrics.add("rows_scanned", paged_table.row_count)
+        return paged_table.iter_records()
+
+    pages = find_paged_pages(paged_table, where_clause)
+    row_count = sum(paged_table.directory[page][2] for page in pages)
+    metrics.add("rows_scanned", row_count)
+    if should_scan_in_parallel(row_count):
+        return run_parallel_scan(
+            scan_pages_chunk, (paged_table, list(pages)), where_clause, len(pages)
+        )
+    return filter_paged_records(paged_table, pages, where_clause)
+
+
+def apply_table_changes(records, changes, where_clause=None):
+    # Строки снимка, измененные журналом, подменяются на месте, удаленные
+    # пропускаются; новые строки и измененные, которые прежде не подходили
+    # под условие, идут в конце
+    if not changes:
+        return records
+
+    changed_rows = [row for row in changes.values() if row is not None]
+    predicate = None
+    if where_clause is not None and changed_rows:
+        predicate = compile_where(where_clause, changed_rows[0])
+    return iter_changed_records(records, dict(changes), predicate)
+
+
+def iter_changed_records(records, pending, predicate):
+    for record in records:
+        if record[PRIMARY_KEY] not in pending:
+            yield record
+            continue
+
+        changed = pending.pop(record[PRIMARY_KEY])
+        if changed is not None and (predicate is None or predicate(changed)):
+            yield changed
+
+    for changed in pending.values():
+        if changed is not None and (predicate is None or predicate(changed)):
+            yield changed
+
+
+def find_paged_pages(paged_table, where_clause):
+    for condition in get_and_conditions(where_clause):
+        if get_condition_column(condition) == PRIMARY_KEY:
+            record_id = convert_value(condition[PRIMARY_KEY], "int")
+            operator = condition.get("_operator", "=")
+            return paged_table.find_pages(operator, record_id)
+    return range(paged_table.page_count)
+
+
+def filter_paged_records(paged_table, pages, where_clause):
+    records = paged_table.iter_records(pages)
+    first_record = next(records, None)
+    if first_record is None:
+        return iter([])
+
+    predicate = compile_where(where_clause, first_record)
+    return filter(predicate, chain([first_record], records))
+
+
+def scan_pages_chunk(bounds):
+    # Выполняется в рабочем процессе: mmap файла унаследован через fork,
+    # обратно передаются только подходящие строки
+    paged_table, pages = shared_scan["source"]
+    start, stop = bounds
+    return list(
+        filter_paged_records(paged_table, pages[start:stop], shared_scan["where"])
+    )
+
+
+def get_aggregate_name(function, column):
+    return f"{function}({column})"
+
+
+def validate_aggregates(table_schema, aggregates, group_by):
+    for column in group_by:
+        if column not in table_schema:
+            print(f'Ошибка: Столбец "{column}" не существует.')
+            return False
+
+    for function, column in aggregates:
+        if column == "*":
+            continue
+        if column not in table_schema:
+            print(f'Ошибка: Столбец "{column}" не существует.')
+            return False
+        if function in NUMERIC_AGGREGATES and table_schema[column] != "int":
+            print(f'Ошибка: {function} применим только к столбцам типа int.')
+            return False
+    return True
+
+
+def new_aggregate_states(aggregates):
+    return [[0, 0, None] for _ in aggregates]
+
+
+def finish_aggregate(function, state):
+    count, total, extreme = state
+    if function == "COUNT":
+        return count
+    if function == "SUM":
+        return total
+    if function == "AVG":
+        return total / count if count else None
+    return extreme
 
-    filtered_data = []
-    for record in table_data:
-        is_match = True
-        for column, value in where_clause.items():
-            if column == "_operator":
-                continue
-                
-            if column not in record:
-                is_match = False
-                break
-                
-            operator = where_clause.get("_operator", "=")
-            record_value = record[column]
-            condition_value = convert_value(value, type(record_value).__name__)
-            
-            if operator == "=":
-                if record_value != condition_value:
-                    is_match = False
-                    break
-            elif operator == ">":
-                if record_value <= condition_value:
-                    is_match = False
-                    break
-            elif operator == "<":
-                if record_value >= condition_value:
-                    is_match = False
-                    break
-            elif operator == ">=":
-                if record_value < condition_value:
-                    is_match = False
-                    break
-            elif operator == "<=":
-                if record_value > condition_value:
-                    is_match = False
-                    break
-                    
-        if is_match:
-            filtered_data.append(record)
-
-    return filtered_data
 
 @handle_db_errors
-def update(table_data, set_clause, where_clause):
-    if not table_data:
-        return table_data
-    
-    updated_count = 0
-    for record in table_data:
-        is_match = True
-        for column, value in where_clause.items():
-            if column == "_operator":
+@log_time
+def aggregate(records, aggregates, group_by):
+    # Один проход по потоку записей: в памяти только состояния групп
+    # [количество, сумма, минимум/максимум], отфильтрованный список не строится
+    groups = {}
+    for record in records:
+        key = tuple(record[column] for column in group_by)
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = new_aggregate_states(aggregates)
+
+        for state, (function, column) in zip(states, aggregates):
+            state[0] += 1
+            if column == "*":
                 continue
-                
-            if column not in record:
-                is_match = False
-                break
-                
-            operator = where_clause.get("_operator", "=")
-            record_value = record[column]
-            condition_value = convert_value(value, type(record_value).__name__)
-            
-            if operator == "=":
-                if record_value != condition_value:
-                    is_match = False
-                    break
-            elif operator == ">":
-                if record_value <= condition_value:
-                    is_match = False
-                    break
-            elif operator == "<":
-                if record_value >= condition_value:
-                    is_match = False
-                    break
-            elif operator == ">=":
-                if record_value < condition_value:
-                    is_match = False
-                    break
-            elif operator == "<=":
-                if record_value > condition_value:
-                    is_match = False
-                    break
-        
-        if is_match:
-            for column, new_value in set_clause.items():
-                if column in record and column != 'ID':
-                    record_type = type(record[column]).__name__
-                    record[column] = convert_value(new_value, record_type)
-                    updated_count += 1
-    
-    print(f'Обновлено {updated_count} записей.')
-    return table_data
+            value = record[column]
+            if function in NUMERIC_AGGREGATES:
+                state[1] += value
+            elif function == "MIN":
+                if state[2] is None or value < state[2]:
+                    state[2] = value
+            elif function == "MAX":
+                if state[2] is None or value > state[2]:
+                    state[2] = value
+
+    if not groups and not group_by:
+        groups[()] = new_aggregate_states(aggregates)
+
+    return (
+        build_aggregate_row(key, groups[key], aggregates, group_by)
+        for key in sorted(groups)
+    )
+
+
+def build_aggregate_row(key, states, aggregates, group_by):
+    row = dict(zip(group_by, key))
+    for state, (function, column) in zip(states, aggregates):
+        row[get_aggregate_name(function, column)] = finish_aggregate(function, state)
+    return row
+
+
+def aggregate_indexed(indexes, aggregates, group_by):
+    # Запросы без WHERE, которые отвечаются по индексам без чтения строк:
+    # количество - по первичному индексу, минимум и максимум - по краям
+    # отсортированного индекса, группировка - по корзинам хэш-индекса
+    if len(group_by) > 1:
+        return None
+
+    group_column = group_by[0] if group_by else None
+    if group_column is not None and (
+        group_column == PRIMARY_KEY or group_column not in indexes
+    ):
+        return None
+
+    for function, column in aggregates:
+        if function == "COUNT":
+            continue
+        if function not in ("MIN", "MAX") or column == PRIMARY_KEY:
+            return None
+        if column not in indexes or group_column not in (None, column):
+            return None
+
+    if group_column is None:
+        row = {}
+        for function, column in aggregates:
+            name = get_aggregate_name(function, column)
+            if function == "COUNT":
+                row[name] = len(indexes[PRIMARY_KEY].rows)
+            else:
+                sorted_values = indexes[column].sorted_values
+                position = 0 if function == "MIN" else -1
+                row[name] = sorted_values[position] if sorted_values else None
+        return [row]
+
+    rows = []
+    for value, record_ids in sorted(indexes[group_column].buckets.items()):
+        row = {group_column: value}
+        for function, column in aggregates:
+            name = get_aggregate_name(function, column)
+            row[name] = len(record_ids) if function == "COUNT" else value
+        rows.append(row)
+    return rows
 
 
 @handle_db_errors
-@confirm_action("удаление записей")
-def delete(table_data, where_clause):
+@log_time
+def analyze_table(metadata, table_name):
+    if table_name not in metadata:
+        print(ERROR_TABLE_NOT_EXISTS.format(table_name))
+        return None
+
+    # Статистика, как и индексы, описывает снимок без журнала, поэтому
+    # она пересобирается вместе со свернутым снимком
+    save_table_data(table_name, load_table_data(table_name))
+    statistics = load_table_indexes(table_name).get(STATISTICS_KEY)
+    if statistics is None:
+        print(f'Ошибка: Не удалось собрать статистику таблицы "{table_name}".')
+        return None
+
+    print(f'Статистика таблицы "{table_name}": {statistics.row_count} строк.')
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = ["столбец", "различных", "минимум", "максимум", "гистограмма"]
+    for column, column_stats in statistics.columns.items():
+        histogram = column_stats.get("histogram")
+        table.add_row([
+            column,
+            column_stats["distinct"],
+            column_stats["min"],
+            column_stats["max"],
+            f"{len(histogram)} интервалов" if histogram else "-",
+        ])
+    print(table)
+    return statistics
+
+
+def format_estimate(estimated_rows):
+    if estimated_rows is None:
+        return "неизвестно"
+    return f"~{round(estimated_rows)}"
+
+
+def print_query_plan(table_name, storage_format, plan, statistics=None):
+    access_descriptions = {
+        "scan": "полный проход по строкам",
+        "parallel_scan": "параллельный полный проход"
+        f" ({parallel_scan['workers']} процессов)",
+        "index": "поиск по индексу",
+        "index_aggregate": "агрегаты по индексам без чтения строк",
+        "column_scan": "проход по столбцам",
+        "page_scan": "чтение страниц",
+        "parallel_page_scan": "параллельное чтение страниц"
+        f" ({parallel_scan['workers']} процессов)",
+    }
+
+    print(f'План запроса к таблице "{table_name}":')
+    print(f"- формат хранения: {storage_format}")
+    print(f"- строк в таблице: {plan['row_count']}")
+    access = access_descriptions[plan["access"]]
+    if plan["access"] == "index":
+        condition = f"{plan['column']} {plan['operator']} {plan['value']}"
+        access += f' "{plan["column"]}" ({condition})'
+    if "pages" in plan:
+        access += f", страниц: {plan['pages']} из {plan['page_count']}"
+    print(f"- доступ: {access}")
+    if plan.get("log_changes"):
+        print(f"- строк из журнала поверх снимка: {plan['log_changes']}")
+    print(f"- ожидается строк: {format_estimate(plan['estimated_rows'])}")
+
+    if plan.get("conditions"):
+        print("- условия с индексом:")
+        for column, condition_operator, value, estimated_rows in plan["conditions"]:
+            estimate = format_estimate(estimated_rows)
+            print(f"    {column} {condition_operator} {value}: {estimate} строк")
+
+    if storage_format != "json":
+        return
+    if statistics is None:
+        print(f"- статистика не собрана (ANALYZE {table_name})")
+    elif statistics.is_stale():
+        msg = f"- статистика устарела: {statistics.modified} изменений после сбора"
+        msg += f" (ANALYZE {table_name})"
+        print(msg)
+    else:
+        print(f"- изменений после сбора статистики: {statistics.modified}")
+
+
+def print_join_plan(plan):
+    build, probe = plan["build"], plan["probe"]
+    print(f'План соединения таблиц "{plan["left"]}" и "{plan["right"]}":')
+    if build["indexed"]:
+        msg = f'- поиск по индексу "{build["column"]}"'
+    else:
+        msg = f'- хэш-таблица по столбцу "{build["column"]}"'
+    msg += f' таблицы "{build["table"]}" ({build["rows"]} строк)'
+    print(msg)
+    msg = f'- потоковое чтение таблицы "{probe["table"]}"'
+    msg += f' ({probe["rows"]} строк) по столбцу "{probe["column"]}"'
+    print(msg)
+    for side in (build, probe):
+        if side["where"] is not None:
+            print(f'- условие для "{side["table"]}" проверяется до соединения')
+    if plan["where"] is not None:
+        print("- остальное условие WHERE проверяется на соединенных строках")
+
+
+def update(table_data, set_clause, where_clause, indexes=None):
     if not table_data:
-        return table_data
-    
+        return []
+
+    sample_record = table_data[0]
+    new_values = {
+        column: convert_value(new_value, type(sample_record[column]).__name__)
+        for column, new_value in set_clause.items()
+        if column in sample_record and column != 'ID'
+    }
+
+    updated_records = filter_records(table_data, where_clause, indexes)
+    for record in updated_records:
+        record.update(new_values)
+
+    metrics.add("rows_returned", len(updated_records))
+    return updated_records
+
+
+def delete(table_data, where_clause, indexes=None):
+    if not table_data:
+        return []
+
     if where_clause is None:
-        deleted_count = len(table_data)
+        deleted_records = list(table_data)
         table_data.clear()
-        print(f'Удалено {deleted_count} записей.')
-        return table_data
-    
-    records_to_keep = []
-    deleted_count = 0
-    
-    for record in table_data:
-        is_match = True
-        for column, value in where_clause.items():
-            if column == "_operator":
-                continue
-                
-            if column not in record:
-                is_match = False
-                break
-                
-            operator = where_clause.get("_operator", "=")
-            record_value = record[column]
-            condition_value = convert_value(value, type(record_value).__name__)
-            
-            if operator == "=":
-                if record_value != condition_value:
-                    is_match = False
-                    break
-            elif operator == ">":
-                if record_value <= condition_value:
-                    is_match = False
-                    break
-            elif operator == "<":
-                if record_value >= condition_value:
-                    is_match = False
-                    break
-            elif operator == ">=":
-                if record_value < condition_value:
-                    is_match = False
-                    break
-            elif operator == "<=":
-                if record_value > condition_value:
-                    is_match = False
-                    break
-        
-        if is_match:
-            deleted_count += 1
-        else:
-            records_to_keep.append(record)
-    
-    print(f'Удалено {deleted_count} записей.')
-    return records_to_keep
+        metrics.add("rows_returned", len(deleted_records))
+        return deleted_records
+
+    deleted_records = filter_records(table_data, where_clause, indexes)
+    if deleted_records:
+        remove_records(table_data, deleted_records)
+
+    metrics.add("rows_returned", len(deleted_records))
+    return deleted_records
+
+
+def remove_records(table_data, records):
+    # Строки лежат по возрастанию ID, поэтому немногие удаляемые строки
+    # находятся бинарным поиском и вырезаются на месте, без копии таблицы
+    if len(records) <= DELETE_IN_PLACE_ROWS:
+        positions = [find_record_position(table_data, record) for record in records]
+        if None not in positions:
+            for position in sorted(positions, reverse=True):
+                del table_data[position]
+            return
+
+    deleted_ids = {record['ID'] for record in records}
+    table_data[:] = [
+        record for record in table_data if record['ID'] not in deleted_ids
+    ]
+
+
+def find_record_position(table_data, record):
+    position = bisect_left(table_data, record['ID'], key=operator.itemgetter('ID'))
+    if position < len(table_data) and table_data[position] is record:
+        return position
+    return None
+
 
 def display_table_data(table_data, table_name):
-    if not table_data:
+    display_records(iter(table_data), table_name)
+
+
+def display_records(records, table_name, output_format="table"):
+    first_record = next(records, None)
+    if first_record is None:
         print(f'Таблица "{table_name}" пуста.')
         return
 
-    table = PrettyTable()
-    table.field_names = table_data[0].keys()
+    records = chain([first_record], records)
+    if metrics.enabled:
+        records = count_returned_rows(records)
+    columns = list(first_record.keys())
+
+    if output_format == "tsv":
+        print("\t".join(map(escape_tsv_value, columns)))
+        for record in records:
+            print("\t".join(map(escape_tsv_value, record.values())))
+        return
+
+    if output_format == "jsonl":
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
+        return
 
-    for record in table_data:
-        table.add_row(record.values())
+    from prettytable import PrettyTable
 
     print(f'\nТаблица "{table_name}":')
-    print(table)
+    while True:
+        page = list(islice(records, DISPLAY_PAGE_ROWS))
+        if not page:
+            break
+
+        table = PrettyTable()
+        table.field_names = columns
+        for record in page:
+            table.add_row(record.values())
+        print(table)
+
+
+def escape_tsv_value(value):
+    # Табуляция и перевод строки внутри значения сдвинули бы столбцы и строки
+    return str(value).translate(TSV_ESCAPES)
+
+
+def count_returned_rows(records):
+    count = 0
+    for count, record in enumerate(records, start=1):
+        yield record
+    metrics.add("rows_returned", count)
 
 
 def validate_value_type(value, expected_type):
     try:
         if expected_type == 'int':
-            int(value)
+            convert_int(value)
         elif expected_type == 'bool':
             if value.lower() not in VALID_BOOLEAN_VALUES:
                 return False
@@ -310,9 +981,16 @@ def validate_value_type(value, expected_type):
 
 def convert_value(value, expected_type):
     if expected_type == 'int':
-        return int(value)
+        return convert_int(value)
     elif expected_type == 'bool':
         return value.lower() in ['true', '1']
     elif expected_type == 'str':
         return str(value)
     return value
+
+
+def convert_int(value):
+    number = int(value)
+    if not INT_MIN <= number <= INT_MAX:
+        raise ValueError(f"целое {number} вне диапазона 64-битных чисел")
+    return number
@@ -0,0 +1,554 @@
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from ..decorators import log_time
+from .constants import (
+    ERROR_COLUMN_COUNT,
+    ERROR_INVALID_DATA_TYPE,
+    ERROR_INVALID_TYPE,
+    ERROR_INVALID_VALUE,
+    ERROR_TABLE_EXISTS,
+    ERROR_TABLE_NOT_EXISTS,
+    LOG_DELETE,
+    LOG_INSERT,
+    LOG_UPDATE,
+    PRIMARY_KEY,
+    STATISTICS_KEY,
+    SUPPORTED_TYPES,
+)
+from .core import (
+    apply_table_changes,
+    build_join_lookup,
+    compile_where,
+    convert_value,
+    delete,
+    get_order_access,
+    get_where_columns,
+    index_join_lookup,
+    iter_ordered_records,
+    join,
+    order_records,
+    select,
+    select_columnar,
+    select_paged,
+    split_join_where,
+    update,
+    validate_value_type,
+)
+from .errors import (
+    DatabaseError,
+    QueryError,
+    SchemaError,
+    TableExistsError,
+    TableNotFoundError,
+    TransactionError,
+    ValidationError,
+)
+from .locks import metadata_lock, table_lock
+from .parser import parse_join_condition, parse_set, parse_where
+from .storage import check_table_name, set_storage_root
+from .utils import (
+    begin_transaction,
+    commit_transaction,
+    flush_deferred_writes,
+    get_cached_table_data,
+    get_cached_table_indexes,
+    get_table_format,
+    in_transaction,
+    load_columnar_table,
+    load_metadata,
+    load_paged_table,
+    load_table_changes,
+    load_table_data,
+    load_table_indexes,
+    next_table_id,
+    recover_transactions,
+    remove_table_indexes,
+    reset_table_sequence,
+    rollback_transaction,
+    save_metadata,
+    save_table_data,
+    set_deferred_writes,
+    sync_pending_logs,
+    validate_column_definition,
+    validate_data_type,
+    write_table_changes,
+)
+
+
+class Database:
+    # Таблицы, индексы и метаданные остаются в кэше процесса между вызовами;
+    # методы ничего не выводят, а об ошибках сообщают исключениями
+    # DatabaseError. Каталог данных и транзакция общие для всего процесса
+    def __init__(self, path=None, batch=False):
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            set_storage_root(path)
+        self.recovered = recover_transactions()
+        set_deferred_writes(batch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Возвращает True, если пришлось отменить незавершенную транзакцию
+        rolled_back = in_transaction()
+        if rolled_back:
+            rollback_transaction()
+        try:
+            set_deferred_writes(False)
+        finally:
+            sync_pending_logs()
+        return rolled_back
+
+    @property
+    def metadata(self):
+        return load_metadata()
+
+    def tables(self):
+        return list(self.metadata)
+
+    def get_schema(self, table_name):
+        metadata = self.metadata
+        if table_name not in metadata:
+            raise TableNotFoundError(ERROR_TABLE_NOT_EXISTS.format(table_name))
+        return metadata[table_name]
+
+    def create_table(self, table_name, columns):
+        check_outside_transaction("create_table")
+        check_table_name(table_name)
+        if isinstance(columns, dict):
+            columns = [
+                f"{column}:{column_type}" for column, column_type in columns.items()
+            ]
+        table_columns = build_table_schema(columns)
+
+        with metadata_lock(exclusive=True):
+            metadata = dict(load_metadata())
+            if table_name in metadata:
+                raise TableExistsError(ERROR_TABLE_EXISTS.format(table_name))
+
+            metadata[table_name] = table_columns
+            save_table_data(table_name, [])
+            reset_table_sequence(table_name)
+            save_metadata(metadata)
+        return table_columns
+
+    def drop_table(self, table_name):
+        check_outside_transaction("drop_table")
+        with metadata_lock(exclusive=True):
+            metadata = dict(load_metadata())
+            if table_name not in metadata:
+                raise TableNotFoundError(ERROR_TABLE_NOT_EXISTS.format(table_name))
+
+            del metadata[table_name]
+            save_metadata(metadata)
+        # Блокировка таблицы берется только после блокировки метаданных,
+        # иначе процессы могли бы ждать друг друга
+        remove_table_indexes(table_name)
+
+    @log_time
+    def insert(self, table_name, values):
+        table_schema = self.get_schema(table_name)
+        values = convert_values(table_name, table_schema, values)
+        with table_lock(table_name, exclusive=True), raise_database_errors():
+            new_record = {PRIMARY_KEY: next_table_id(table_name), **values}
+            append_records(table_name, [new_record])
+        # Сама запись остается в кэше таблицы - вызывающий получает копию
+        return dict(new_record)
+
+    @log_time
+    def insert_many(self, table_name, rows):
+        # Все строки проверяются до записи и уходят в журнал одной дозаписью
+        table_schema = self.get_schema(table_name)
+        new_records = [
+            convert_values(table_name, table_schema, values) for values in rows
+        ]
+        if not new_records:
+            return 0
+
+        with table_lock(table_name, exclusive=True), raise_database_errors():
+            first_id = next_table_id(table_name, len(new_records))
+            new_records = [
+                {PRIMARY_KEY: first_id + offset, **values}
+                for offset, values in enumerate(new_records)
+            ]
+            append_records(table_name, new_records)
+        return len(new_records)
+
+    def select(
+        self,
+        table_name,
+        where=None,
+        limit=None,
+        offset=0,
+        order_by=None,
+        descending=False,
+    ):
+        table_schema = self.get_schema(table_name)
+        check_order_column(order_by, table_schema, table_name)
+        where_clause = get_where_clause(where)
+        stop = None if limit is None else offset + limit
+        with raise_database_errors():
+            if order_by is None:
+                records = select_records(table_name, where_clause)
+            else:
+                records = select_ordered_records(
+                    table_name, where_clause, order_by, descending, stop
+                )
+        # Строки из кэша копируются, чтобы вызывающий код не менял его
+        return map(dict, islice(records, offset, stop))
+
+    def join(
+        self,
+        left_table,
+        right_table,
+        on,
+        where=None,
+        limit=None,
+        offset=0,
+        order_by=None,
+        descending=False,
+    ):
+        # on - строка "a.col = b.col" или пара столбцов (левый, правый);
+        # столбцы результата, where и order_by называются <таблица>.<столбец>
+        plan = self.plan_join(left_table, right_table, on, where)
+        check_order_column(
+            order_by, plan["columns"], f"{left_table} JOIN {right_table}"
+        )
+        stop = None if limit is None else offset + limit
+        with raise_database_errors():
+            records = join_records(plan)
+            if order_by is not None:
+                records = order_records(records, order_by, descending, stop)
+        return islice(records, offset, stop)
+
+    def plan_join(self, left_table, right_table, on, where=None):
+        if left_table == right_table:
+            raise QueryError(
+                "Ошибка: Соединение таблицы с самой собой не поддерживается."
+            )
+        schemas = {
+            left_table: self.get_schema(left_table),
+            right_table: self.get_schema(right_table),
+        }
+        if isinstance(on, str):
+            on = parse_join_condition(on, left_table, right_table)
+        columns = dict(zip(schemas, on))
+
+        for table_name, column in columns.items():
+            if column not in schemas[table_name]:
+                msg = f'Ошибка: Столбец "{column}" не существует'
+                msg += f' в таблице "{table_name}".'
+                raise QueryError(msg)
+        left_type, right_type = (
+            schemas[table_name][column] for table_name, column in columns.items()
+        )
+        if left_type != right_type:
+            msg = f'Ошибка: Столбцы соединения имеют разные типы ({left_type}'
+            msg += f" и {right_type})."
+            raise QueryError(msg)
+
+        joined_columns = [
+            f"{table_name}.{column}"
+            for table_name, schema in schemas.items()
+            for column in schema
+        ]
+        where_clause = get_where_clause(where)
+        if where_clause is not None:
+            for column in get_where_columns(where_clause):
+                if column not in joined_columns:
+                    msg = f'Ошибка: Столбец "{column}" не найден.'
+                    msg += " Указывайте столбцы как <таблица>.<столбец>."
+                    raise QueryError(msg)
+
+        pushed, remaining = split_join_where(where_clause, list(schemas))
+        sides = [
+            {
+                "table": table_name,
+                "column": column,
+                "where": pushed[table_name],
+                "rows": count_table_rows(table_name),
+                "indexed": has_join_index(table_name, column),
+            }
+            for table_name, column in columns.items()
+        ]
+        # По готовому индексу ищется большая из индексированных таблиц,
+        # иначе хэш-таблица строится по меньшей; другая читается потоком
+        indexed = [side for side in sides if side["indexed"]]
+        if indexed:
+            build = max(indexed, key=lambda side: side["rows"])
+        else:
+            build = min(sides, key=lambda side: side["rows"])
+        probe = sides[0] if build is sides[1] else sides[1]
+        return {
+            "left": left_table,
+            "right": right_table,
+            "columns": joined_columns,
+            "build": build,
+            "probe": probe,
+            "where": remaining,
+        }
+
+    @log_time
+    def update(self, table_name, values, where=None):
+        self.get_schema(table_name)
+        set_clause = parse_set(values) if isinstance(values, str) else values
+        where_clause = get_where_clause(where)
+
+        with table_lock(table_name, exclusive=True), raise_database_errors():
+            table_data = load_table_data(table_name)
+            indexes = load_table_indexes(table_name)
+            updated_records = update(table_data, set_clause, where_clause, indexes)
+            if updated_records:
+                entries = [
+                    {"op": LOG_UPDATE, "row": record} for record in updated_records
+                ]
+                check_written(write_table_changes(table_name, entries, indexes))
+        return len(updated_records)
+
+    @log_time
+    def delete(self, table_name, where=None):
+        self.get_schema(table_name)
+        where_clause = get_where_clause(where)
+
+        with table_lock(table_name, exclusive=True), raise_database_errors():
+            table_data = load_table_data(table_name)
+            indexes = load_table_indexes(table_name)
+            deleted_records = delete(table_data, where_clause, indexes)
+            if not deleted_records:
+                return 0
+            if where_clause is None and not in_transaction():
+                check_written(save_table_data(table_name, table_data))
+            else:
+                entries = [
+                    {"op": LOG_DELETE, "id": record[PRIMARY_KEY]}
+                    for record in deleted_records
+                ]
+                check_written(write_table_changes(table_name, entries, indexes))
+        return len(deleted_records)
+
+    def begin(self):
+        if in_transaction():
+            raise TransactionError("Ошибка: Транзакция уже начата.")
+        begin_transaction()
+
+    def commit(self):
+        # Вне транзакции записывает изменения, накопленные в пакетном режиме
+        if in_transaction():
+            return commit_transaction()
+        return flush_deferred_writes()
+
+    def rollback(self):
+        if not in_transaction():
+            raise TransactionError("Ошибка: Нет активной транзакции.")
+        return rollback_transaction()
+
+    @contextmanager
+    def transaction(self):
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            rollback_transaction()
+            raise
+        commit_transaction()
+
+
+def check_outside_transaction(command):
+    if in_transaction():
+        raise TransactionError(
+            f'Ошибка: Команда "{command}" недоступна внутри транзакции.'
+        )
+
+
+@contextmanager
+def raise_database_errors():
+    # Те же сообщения, что выводит handle_db_errors
+    try:
+        yield
+    except DatabaseError:
+        raise
+    except KeyError as error:
+        msg = f"Ошибка: Обращение к несуществующему ключу - {error}"
+        raise QueryError(msg) from error
+    except ValueError as error:
+        raise ValidationError(f"Ошибка валидации данных: {error}") from error
+
+
+def build_table_schema(columns):
+    table_columns = {PRIMARY_KEY: "int"}
+    for column_definition in columns:
+        if not validate_column_definition(column_definition):
+            raise SchemaError(ERROR_INVALID_VALUE.format(column_definition))
+
+        column_name, column_type = column_definition.split(":")
+        if not validate_data_type(column_type):
+            supported_types_str = ", ".join(SUPPORTED_TYPES)
+            raise SchemaError(
+                ERROR_INVALID_DATA_TYPE.format(column_type, supported_types_str)
+            )
+        table_columns[column_name] = column_type
+    return table_columns
+
+
+def convert_values(table_name, table_schema, values):
+    # Значения принимаются списком в порядке столбцов или словарем; строки
+    # из командной строки и значения Python проверяются одинаково
+    columns = list(table_schema.keys())[1:]
+    if isinstance(values, dict):
+        for column in values:
+            if column not in columns:
+                msg = f'Ошибка: Столбец "{column}" не существует'
+                msg += f' в таблице "{table_name}".'
+                raise ValidationError(msg)
+        if len(values) != len(columns):
+            raise ValidationError(ERROR_COLUMN_COUNT.format(len(columns), len(values)))
+        values = [values[column] for column in columns]
+    elif len(values) != len(columns):
+        raise ValidationError(ERROR_COLUMN_COUNT.format(len(columns), len(values)))
+
+    record = {}
+    for column, value in zip(columns, values):
+        expected_type = table_schema[column]
+        value = str(value)
+        if not validate_value_type(value, expected_type):
+            raise ValidationError(ERROR_INVALID_TYPE.format(column, expected_type))
+        record[column] = convert_value(value, expected_type)
+    return record
+
+
+def append_records(table_name, new_records):
+    table_data = get_cached_table_data(table_name)
+    if table_data is not None:
+        table_data.extend(new_records)
+    written = write_table_changes(
+        table_name,
+        [{"op": LOG_INSERT, "row": record} for record in new_records],
+        get_cached_table_indexes(table_name),
+    )
+    check_written(written)
+
+
+def check_written(written):
+    if not written:
+        raise DatabaseError("Ошибка: Не удалось записать изменения на диск.")
+
+
+def get_where_clause(where):
+    # Условие задается строкой в синтаксисе WHERE или уже разобранным словарем
+    if isinstance(where, str):
+        return parse_where(where)
+    return where
+
+
+def check_order_column(column, columns, table_name):
+    if column is not None and column not in columns:
+        msg = f'Ошибка: Столбец "{column}" не существует'
+        msg += f' в таблице "{table_name}".'
+        raise QueryError(msg)
+
+
+def select_ordered_records(table_name, where_clause, column, descending, count):
+    if get_table_format(table_name) == "json":
+        table_data = load_table_data(table_name)
+        indexes = load_table_indexes(table_name)
+        access = get_order_access(where_clause, indexes, column, len(table_data))
+        if access == "index":
+            return iter_ordered_records(
+                table_data, where_clause, indexes, column, descending
+            )
+
+    records = select_records(table_name, where_clause)
+    return order_records(records, column, descending, count)
+
+
+def count_table_rows(table_name):
+    for load_table in (load_columnar_table, load_paged_table):
+        table = load_table(table_name)
+        if table is not None:
+            return table.row_count
+    return len(load_table_data(table_name))
+
+
+def has_join_index(table_name, column):
+    # Индексы ведутся только для таблиц в формате JSON
+    if column == STATISTICS_KEY or get_table_format(table_name) != "json":
+        return False
+    return column in load_table_indexes(table_name)
+
+
+def join_records(plan):
+    build, probe = plan["build"], plan["probe"]
+    predicate = None
+    if plan["where"] is not None:
+        # Условие компилируется до чтения строк, чтобы ошибка в значении
+        # всплыла при вызове, а не на первой строке результата
+        predicate = compile_where(plan["where"], get_joined_sample(plan))
+    if build["indexed"]:
+        lookup = index_join_lookup(
+            load_table_indexes(build["table"]), build["column"], build["where"]
+        )
+    else:
+        lookup = build_join_lookup(
+            select_records(build["table"], build["where"]), build["column"]
+        )
+
+    probe_records = select_records(probe["table"], probe["where"])
+    pairs = join(lookup, probe_records, probe["column"])
+    if build["table"] == plan["left"]:
+        left_prefix, right_prefix = f"{build['table']}.", f"{probe['table']}."
+    else:
+        left_prefix, right_prefix = f"{probe['table']}.", f"{build['table']}."
+        pairs = ((left_record, right_record) for right_record, left_record in pairs)
+    records = (
+        {
+            **qualify_record(left_record, left_prefix),
+            **qualify_record(right_record, right_prefix),
+        }
+        for left_record, right_record in pairs
+    )
+
+    if predicate is not None:
+        records = filter(predicate, records)
+    return records
+
+
+def get_joined_sample(plan):
+    metadata = load_metadata()
+    return {
+        f"{table_name}.{column}": convert_value("0", column_type)
+        for table_name in (plan["left"], plan["right"])
+        for column, column_type in metadata[table_name].items()
+    }
+
+
+def qualify_record(record, prefix):
+    return {prefix + column: value for column, value in record.items()}
+
+
+def select_records(table_name, where_clause):
+    with table_lock(table_name):
+        columnar_table = load_columnar_table(table_name)
+        if columnar_table is not None:
+            return apply_table_changes(
+                select_columnar(columnar_table, where_clause),
+                load_table_changes(table_name),
+                where_clause,
+            )
+
+        paged_table = load_paged_table(table_name)
+        if paged_table is not None:
+            return apply_table_changes(
+                select_paged(paged_table, where_clause),
+                load_table_changes(table_name),
+                where_clause,
+            )
+
+    table_data = load_table_data(table_name)
+    indexes = load_table_indexes(table_name) if where_clause else None
+    return select(table_data, where_clause, indexes)
@@ -1,73 +1,334 @@
 import shlex
+from itertools import islice
 
-import prompt
-
+from ..decorators import confirm_action
+from .constants import (
+    NON_TRANSACTIONAL_COMMANDS,
+    PROFILE_TOP_ENTRIES,
+    STATISTICS_KEY,
+)
 from .core import (
-    create_table,
-    delete,
-    display_table_data,
-    drop_table,
-    insert,
+    aggregate,
+    aggregate_indexed,
+    analyze_table,
+    convert_table,
+    create_index,
+    display_records,
+    find_paged_pages,
+    get_aggregate_name,
+    get_order_access,
     list_tables,
-    select,
-    update,
+    migrate_tables,
+    order_records,
+    plan_query,
+    print_join_plan,
+    print_query_plan,
+    show_stats,
+    validate_aggregates,
+)
+from .database import Database
+from .errors import CorruptedFileError, DatabaseError
+from .locks import table_lock
+from .metrics import metrics
+from .parallel import parallel_scan, set_parallel_scan, should_scan_in_parallel
+from .parser import parse_select_query, parse_set_clause, parse_where_condition
+from .transfer import export_table, import_table
+from .utils import (
+    get_table_format,
+    in_transaction,
+    load_columnar_table,
+    load_paged_table,
+    load_table_changes,
+    load_table_data,
+    load_table_indexes,
+    set_group_commit,
 )
-from .parser import parse_set_clause, parse_where_condition
-from .utils import load_metadata, load_table_data, save_metadata, save_table_data
+
+# Команды, недоступные в текущем режиме (на сервере - транзакции), вместе
+# с пояснением для пользователя
+disabled_commands = {"commands": (), "reason": ""}
+# Команды, завершившиеся ошибкой базы данных, - по ним сценарий выбирает
+# код выхода
+failed_commands = {"count": 0}
+
+
+def disable_commands(commands, reason):
+    disabled_commands["commands"] = tuple(commands)
+    disabled_commands["reason"] = reason
 
 
 def run():
+    # Интерактивный ввод нужен только в этом режиме
+    import prompt
+
     print("***База данных***\n")
     print_help()
+    database = open_session()
+    if database is None:
+        return
 
     while True:
-        metadata = load_metadata()
-
         try:
             user_input = prompt.string("Введите команду: ").strip()
         except (EOFError, KeyboardInterrupt):
             print("\nВыход из программы...")
             break
 
-        if not user_input:
-            continue
+        if not run_line(database, user_input):
+            break
 
+    close_session(database)
+
+
+def run_script(lines):
+    # Пакетный режим: изменения копятся в памяти и записываются один раз
+    # в конце сценария или по команде COMMIT. Возвращает код выхода: 1, если
+    # команда или итоговая запись на диск завершились ошибкой
+    database = open_session(batch=True)
+    if database is None:
+        return 1
+
+    failed_commands["count"] = 0
+    closed = False
+    try:
+        for line in lines:
+            line = line.strip().rstrip(";").strip()
+            if not line or line.startswith(("#", "--")):
+                continue
+
+            if not run_line(database, line):
+                break
+    finally:
+        closed = close_session(database)
+    return 0 if closed and not failed_commands["count"] else 1
+
+
+def open_session(batch=False):
+    try:
+        database = Database(batch=batch)
+    except CorruptedFileError as error:
+        print(f"Ошибка: {error}")
+        print("Выход из программы...")
+        return None
+
+    if database.recovered:
+        print(f"Восстановлено прерванных фиксаций: {database.recovered}.")
+    return database
+
+
+def close_session(database):
+    try:
+        rolled_back = database.close()
+    except DatabaseError as error:
+        print(error)
+        return False
+    if rolled_back:
+        print("Незавершенная транзакция отменена.")
+    return True
+
+
+def run_line(database, user_input):
+    if not user_input:
+        return True
+
+    try:
+        arguments = shlex.split(user_input)
+    except ValueError as error:
+        print(f"Ошибка разбора команды: {error}")
+        return True
+
+    if not arguments:
+        return True
+
+    try:
+        table_name = get_command_table(database.metadata, arguments)
+        with metrics.command(arguments[0].lower(), table_name):
+            return execute_command(database, arguments)
+    except CorruptedFileError as error:
+        print(f"Ошибка: {error}")
+        failed_commands["count"] += 1
+        return True
+    except DatabaseError as error:
+        print(error)
+        failed_commands["count"] += 1
+        return True
+
+
+def get_command_table(metadata, arguments):
+    # Метрики команды относятся к таблице, которую она затрагивает
+    if arguments[0].lower() in ("explain", "profile"):
+        return get_command_table(metadata, arguments[1:] or ["-"])
+    if len(arguments) > 1 and arguments[1] in metadata:
+        return arguments[1]
+    return "-"
+
+
+def execute_command(database, arguments):
+    command = arguments[0].lower()
+    metadata = database.metadata
+
+    if command in NON_TRANSACTIONAL_COMMANDS and in_transaction():
+        print(f'Ошибка: Команда "{command}" недоступна внутри транзакции.')
+        return True
+    # Проверка здесь, а не при разборе строки: profile выполняет вложенную
+    # команду через execute_command
+    if command in disabled_commands["commands"]:
+        print(f'Ошибка: Команда "{command}" {disabled_commands["reason"]}.')
+        return True
+
+    if command == "exit":
+        print("Выход из программы...")
+        return False
+    elif command == "help":
+        print_help()
+    elif command == "create_table":
+        handle_create_table(database, arguments)
+    elif command == "list_tables":
+        list_tables(metadata)
+    elif command == "stats":
+        handle_stats(arguments)
+    elif command == "profile":
+        return handle_profile(database, arguments)
+    elif command == "group_commit":
+        handle_group_commit(arguments)
+    elif command == "parallel":
+        handle_parallel(arguments)
+    elif command == "begin":
+        handle_begin(database)
+    elif command == "commit":
+        handle_commit(database)
+    elif command == "rollback":
+        handle_rollback(database)
+    elif command == "drop_table":
+        handle_drop_table(database, arguments)
+    elif command == "create_index":
+        handle_create_index(metadata, arguments)
+    elif command == "convert_table":
+        handle_convert_table(metadata, arguments)
+    elif command == "migrate":
+        migrate_tables(metadata, arguments[1:])
+    elif command == "insert":
+        handle_insert(database, arguments)
+    elif command == "import":
+        handle_import(metadata, arguments)
+    elif command == "export":
+        handle_export(metadata, arguments)
+    elif command == "select":
+        handle_select(database, arguments)
+    elif command == "explain":
+        handle_explain(database, arguments)
+    elif command == "analyze":
+        handle_analyze(metadata, arguments)
+    elif command == "update":
+        handle_update(database, arguments)
+    elif command == "delete":
+        handle_delete(database, arguments)
+    else:
+        print(f"Функции '{command}' нет. Попробуйте снова.")
+        print("Введите 'help' для справки.")
+    return True
+
+
+def handle_stats(arguments):
+    if len(arguments) < 2:
+        show_stats()
+        return
+
+    subcommand = arguments[1].lower()
+    if subcommand == "reset":
+        metrics.reset()
+        print("Метрики операций сброшены.")
+    elif subcommand in ("on", "off"):
+        metrics.enabled = subcommand == "on"
+        print(f"Сбор метрик {'включен' if metrics.enabled else 'выключен'}.")
+    elif subcommand == "save" and len(arguments) > 2:
         try:
-            arguments = shlex.split(user_input)
-        except ValueError as error:
-            print(f"Ошибка разбора команды: {error}")
-            continue
+            metrics.dump(arguments[2])
+        except OSError as error:
+            print(f"Ошибка: Не удалось записать метрики - {error}")
+            return
+        print(f'Метрики операций сохранены в "{arguments[2]}".')
+    else:
+        msg = "Ошибка: Неизвестная подкоманда."
+        msg += " Использование: stats [reset | on | off | save <файл.json>]"
+        print(msg)
 
-        if not arguments:
-            continue
 
-        command = arguments[0].lower()
+def handle_profile(database, arguments):
+    if len(arguments) < 2:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: profile <команда> [аргументы ...]"
+        print(msg)
+        return True
 
-        if command == "exit":
-            print("Выход из программы...")
-            break
-        elif command == "help":
-            print_help()
-        elif command == "create_table":
-            handle_create_table(metadata, arguments)
-        elif command == "list_tables":
-            list_tables(metadata)
-        elif command == "drop_table":
-            handle_drop_table(metadata, arguments)
-        elif command == "insert":
-            handle_insert(metadata, arguments)
-        elif command == "select":
-            handle_select(metadata, arguments)
-        elif command == "update":
-            handle_update(metadata, arguments)
-        elif command == "delete":
-            handle_delete(metadata, arguments)
-        else:
-            print(f"Функции '{command}' нет. Попробуйте снова.")
-            print("Введите 'help' для справки.")
-
-
-def handle_create_table(metadata, arguments):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(execute_command, database, arguments[1:])
+    print(f"\nПрофиль команды \"{arguments[1]}\":")
+    profile_stats = pstats.Stats(profiler)
+    profile_stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    profile_stats.print_stats(PROFILE_TOP_ENTRIES)
+    return result
+
+
+def handle_group_commit(arguments):
+    if len(arguments) < 2 or not arguments[1].isdigit():
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: group_commit <число_изменений> (0 - выключить)"
+        print(msg)
+        return
+
+    size = int(arguments[1])
+    set_group_commit(size)
+    if size > 1:
+        print(f"Групповая фиксация: один fsync на {size} изменений.")
+    else:
+        print("Групповая фиксация выключена: fsync после каждого изменения.")
+
+
+def handle_parallel(arguments):
+    if len(arguments) < 2 or not all(
+        argument.isdigit() for argument in arguments[1:3]
+    ):
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: parallel <число_процессов> [мин_строк]"
+        print(msg)
+        return
+
+    workers = int(arguments[1])
+    min_rows = int(arguments[2]) if len(arguments) > 2 else None
+    set_parallel_scan(workers, min_rows)
+    if parallel_scan["workers"] > 1:
+        msg = f"Параллельное сканирование: {parallel_scan['workers']} процессов"
+        msg += f" для таблиц от {parallel_scan['min_rows']} строк."
+        print(msg)
+    else:
+        print("Параллельное сканирование выключено.")
+
+
+def handle_begin(database):
+    database.begin()
+    print("Транзакция начата.")
+
+
+def handle_commit(database):
+    if in_transaction():
+        changes = database.commit()
+        print(f"Транзакция зафиксирована, изменений: {changes}.")
+        return
+
+    changes = database.commit()
+    print(f"Изменения записаны на диск: {changes}.")
+
+
+def handle_rollback(database):
+    changes = database.rollback()
+    print(f"Транзакция отменена, отброшено изменений: {changes}.")
+
+
+def handle_create_table(database, arguments):
     if len(arguments) < 3:
         msg = "Ошибка: Недостаточно аргументов."
         msg += " Использование: create_table <имя_таблицы> <столбец1:тип> ..."
@@ -75,69 +336,276 @@ def handle_create_table(metadata, arguments):
         return
 
     table_name = arguments[1]
-    columns = arguments[2:]
-    result = create_table(metadata, table_name, columns)
-    if result is not None:
-        save_metadata(result)
+    table_columns = database.create_table(table_name, arguments[2:])
+    columns_str = ", ".join([f"{col}:{typ}" for col, typ in table_columns.items()])
+    print(f'Таблица "{table_name}" успешно создана со столбцами: {columns_str}')
 
 
-def handle_drop_table(metadata, arguments):
+def handle_drop_table(database, arguments):
     if len(arguments) < 2:
         msg = "Ошибка: Недостаточно аргументов."
         msg += " Использование: drop_table <имя_таблицы>"
         print(msg)
         return
 
-    table_name = arguments[1]
-    result = drop_table(metadata, table_name)
-    if result is not None:
-        save_metadata(result)
+    if drop_table(database, arguments[1]) is not None:
+        print(f'Таблица "{arguments[1]}" успешно удалена.')
+
+
+@confirm_action("удаление таблицы")
+def drop_table(database, table_name):
+    database.drop_table(table_name)
+    return table_name
+
+
+def handle_create_index(metadata, arguments):
+    if len(arguments) < 3:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: create_index <имя_таблицы> <столбец>"
+        print(msg)
+        return
+
+    with table_lock(arguments[1], exclusive=True):
+        create_index(metadata, arguments[1], arguments[2])
+
+
+def handle_convert_table(metadata, arguments):
+    if len(arguments) < 3:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: convert_table <имя_таблицы> <json|columnar|paged>"
+        print(msg)
+        return
+
+    with table_lock(arguments[1], exclusive=True):
+        convert_table(metadata, arguments[1], arguments[2])
 
 
-def handle_insert(metadata, arguments):
+def handle_insert(database, arguments):
     if len(arguments) < 3:
         msg = "Ошибка: Недостаточно аргументов."
         msg += " Использование: insert <имя_таблицы> <значение1> <значение2> ..."
         print(msg)
         return
-    
+
     table_name = arguments[1]
-    
-    # Простой split для всех аргументов после имени таблицы
-    values = arguments[2:]
-    
-    if values is not None:
-        result = insert(metadata, table_name, values)
-        if result is not None:
-            save_table_data(table_name, result)
-
-def handle_select(metadata, arguments):
+    new_record = database.insert(table_name, arguments[2:])
+    print(f'Запись успешно добавлена в таблицу "{table_name}" с ID {new_record["ID"]}.')
+
+
+def handle_import(metadata, arguments):
+    if len(arguments) < 3:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: import <имя_таблицы> <файл.csv|файл.jsonl>"
+        print(msg)
+        return
+
+    with table_lock(arguments[1], exclusive=True):
+        import_table(metadata, arguments[1], arguments[2])
+
+
+def handle_export(metadata, arguments):
+    if len(arguments) < 3:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: export <имя_таблицы> <файл.csv|файл.jsonl>"
+        print(msg)
+        return
+
+    export_table(metadata, arguments[1], arguments[2])
+
+
+def handle_select(database, arguments):
     if len(arguments) < 2:
         msg = "Ошибка: Недостаточно аргументов."
-        msg += " Использование: select <имя_таблицы> [WHERE условие]"
+        msg += " Использование: select <имя_таблицы> [COUNT(*)|SUM(столбец) ...]"
+        msg += " [JOIN <таблица> ON <условие>]"
+        msg += " [WHERE условие] [GROUP BY столбец] [ORDER BY столбец [ASC|DESC]]"
+        msg += " [LIMIT n] [OFFSET n] [FORMAT table|tsv|jsonl]"
         print(msg)
         return
 
     table_name = arguments[1]
+    table_schema = database.get_schema(table_name)
+
+    query = parse_select_query(arguments[2:])
+    if query is None:
+        return
+
+    if query["join"] is not None:
+        join_table = query["join"]["table"]
+        records = database.join(
+            table_name,
+            join_table,
+            query["join"]["on"],
+            query["where"],
+            query["limit"],
+            query["offset"],
+            query["order_by"],
+            query["descending"],
+        )
+        display_records(records, f"{table_name} JOIN {join_table}", query["format"])
+        return
+
+    if query["aggregates"]:
+        records = aggregate_records(database, table_schema, table_name, query)
+        if records is None:
+            return
+        start = query["offset"]
+        stop = None if query["limit"] is None else start + query["limit"]
+        if query["order_by"] is not None:
+            records = order_aggregated_records(records, query, stop)
+            if records is None:
+                return
+        records = islice(records, start, stop)
+    else:
+        records = database.select(
+            table_name,
+            query["where"],
+            query["limit"],
+            query["offset"],
+            query["order_by"],
+            query["descending"],
+        )
+    display_records(records, table_name, query["format"])
+
+
+def aggregate_records(database, table_schema, table_name, query):
+    aggregates = query["aggregates"]
+    group_by = query["group_by"]
+    if not validate_aggregates(table_schema, aggregates, group_by):
+        return None
+
+    if query["where"] is None and get_table_format(table_name) == "json":
+        rows = aggregate_indexed(load_table_indexes(table_name), aggregates, group_by)
+        if rows is not None:
+            return iter(rows)
+
+    records = database.select(table_name, query["where"])
+    return aggregate(records, aggregates, group_by)
+
+
+def order_aggregated_records(records, query, count):
+    columns = query["group_by"] + [
+        get_aggregate_name(function, column) for function, column in query["aggregates"]
+    ]
+    if query["order_by"] not in columns:
+        msg = f'Ошибка: Столбца "{query["order_by"]}" нет в результате.'
+        msg += f" Доступные столбцы: {', '.join(columns)}."
+        print(msg)
+        return None
+    return order_records(records, query["order_by"], query["descending"], count)
+
+
+def handle_explain(database, arguments):
+    if len(arguments) < 3 or arguments[1].lower() != "select":
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: explain select <имя_таблицы> [WHERE условие] ..."
+        print(msg)
+        return
+
+    table_name = arguments[2]
+    metadata = database.metadata
 
     if table_name not in metadata:
         print(f'Ошибка: Таблица "{table_name}" не существует.')
         return
 
-    where_clause = None
-    if len(arguments) > 2:
-        where_string = ' '.join(arguments[2:])
-        where_clause = parse_where_condition(where_string)
-        if where_clause is None:
-            return
+    query = parse_select_query(arguments[3:])
+    if query is None:
+        return
+    if query["join"] is not None:
+        plan = database.plan_join(
+            table_name, query["join"]["table"], query["join"]["on"], query["where"]
+        )
+        print_join_plan(plan)
+        return
+    if query["aggregates"] and not validate_aggregates(
+        metadata[table_name], query["aggregates"], query["group_by"]
+    ):
+        return
+
+    plan, statistics = build_query_plan(table_name, query)
+    print_query_plan(table_name, get_table_format(table_name), plan, statistics)
+    if query["order_by"] is not None:
+        print_order_plan(table_name, query)
+
+
+def print_order_plan(table_name, query):
+    column = query["order_by"]
+    access = "sort"
+    if not query["aggregates"] and get_table_format(table_name) == "json":
+        table_data = load_table_data(table_name)
+        indexes = load_table_indexes(table_name)
+        access = get_order_access(query["where"], indexes, column, len(table_data))
+
+    if access == "index":
+        msg = f'- порядок: чтение по индексу "{column}" без сортировки'
+    elif query["limit"] is not None:
+        count = query["offset"] + query["limit"]
+        msg = f"- порядок: отбор первых {count} строк кучей"
+    else:
+        msg = "- порядок: полная сортировка результата"
+    print(msg)
+
+
+def build_query_plan(table_name, query):
+    # Повторяет выбор пути из Database.select, но ничего не читает построчно
+    where_clause = query["where"]
+
+    columnar_table = load_columnar_table(table_name)
+    if columnar_table is not None:
+        row_count = columnar_table.row_count
+        plan = {"access": "column_scan", "row_count": row_count}
+        plan["estimated_rows"] = None if where_clause else row_count
+        plan["log_changes"] = len(load_table_changes(table_name))
+        return plan, None
+
+    paged_table = load_paged_table(table_name)
+    if paged_table is not None:
+        pages = range(paged_table.page_count)
+        if where_clause is not None:
+            pages = find_paged_pages(paged_table, where_clause)
+        scanned_rows = sum(paged_table.directory[page][2] for page in pages)
+        access = "page_scan"
+        if where_clause is not None and should_scan_in_parallel(scanned_rows):
+            access = "parallel_page_scan"
+        plan = {
+            "access": access,
+            "row_count": paged_table.row_count,
+            "estimated_rows": None if where_clause else scanned_rows,
+            "pages": len(pages),
+            "page_count": paged_table.page_count,
+            "log_changes": len(load_table_changes(table_name)),
+        }
+        return plan, None
 
     table_data = load_table_data(table_name)
-    if table_data is not None:
-        result_data = select(table_data, where_clause)
-        display_table_data(result_data, table_name)
+    indexes = load_table_indexes(table_name)
+    statistics = indexes.get(STATISTICS_KEY)
+    if query["aggregates"] and where_clause is None:
+        rows = aggregate_indexed(indexes, query["aggregates"], query["group_by"])
+        if rows is not None:
+            plan = {
+                "access": "index_aggregate",
+                "row_count": len(table_data),
+                "estimated_rows": len(rows),
+            }
+            return plan, statistics
+
+    return plan_query(where_clause, indexes, len(table_data)), statistics
+
+
+def handle_analyze(metadata, arguments):
+    if len(arguments) < 2:
+        msg = "Ошибка: Недостаточно аргументов."
+        msg += " Использование: analyze <имя_таблицы>"
+        print(msg)
+        return
 
+    with table_lock(arguments[1], exclusive=True):
+        analyze_table(metadata, arguments[1])
 
-def handle_update(metadata, arguments):
+
+def handle_update(database, arguments):
     if len(arguments) < 4:
         msg = "Ошибка: Недостаточно аргументов."
         msg += " Использование: update <имя_таблицы> SET <условие> [WHERE условие]"
@@ -145,10 +613,7 @@ def handle_update(metadata, arguments):
         return
 
     table_name = arguments[1]
-
-    if table_name not in metadata:
-        print(f'Ошибка: Таблица "{table_name}" не существует.')
-        return
+    database.get_schema(table_name)
 
     if arguments[2].upper() != 'SET':
         print("Ошибка: Ожидается ключевое слово SET")
@@ -168,17 +633,20 @@ def handle_update(metadata, arguments):
         where_string = None
 
     set_clause = parse_set_clause(set_string)
-    where_clause = parse_where_condition(where_string) if where_string else None
+    if set_clause is None:
+        return
 
-    if set_clause is not None:
-        table_data = load_table_data(table_name)
-        if table_data is not None:
-            result_data = update(table_data, set_clause, where_clause)
-            if result_data is not None:
-                save_table_data(table_name, result_data)
+    where_clause = None
+    if where_string:
+        where_clause = parse_where_condition(where_string)
+        if where_clause is None:
+            return
+
+    updated_count = database.update(table_name, set_clause, where_clause)
+    print(f'Обновлено {updated_count} записей.')
 
 
-def handle_delete(metadata, arguments):
+def handle_delete(database, arguments):
     if len(arguments) < 2:
         msg = "Ошибка: Недостаточно аргументов."
         msg += " Использование: delete <имя_таблицы> [WHERE условие]"
@@ -186,10 +654,7 @@ def handle_delete(metadata, arguments):
         return
 
     table_name = arguments[1]
-
-    if table_name not in metadata:
-        print(f'Ошибка: Таблица "{table_name}" не существует.')
-        return
+    database.get_schema(table_name)
 
     where_clause = None
     if len(arguments) > 2:
@@ -198,11 +663,14 @@ def handle_delete(metadata, arguments):
         if where_clause is None:
             return
 
-    table_data = load_table_data(table_name)
-    if table_data is not None:
-        result_data = delete(table_data, where_clause)
-        if result_data is not None:
-            save_table_data(table_name, result_data)
+    deleted_count = delete_records(database, table_name, where_clause)
+    if deleted_count is not None:
+        print(f'Удалено {deleted_count} записей.')
+
+
+@confirm_action("удаление записей")
+def delete_records(database, table_name, where_clause):
+    return database.delete(table_name, where_clause)
 
 
 def print_help():
@@ -211,14 +679,45 @@ def print_help():
     print("  create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
     print("  list_tables - показать список всех таблиц")
     print("  drop_table <имя_таблицы> - удалить таблицу")
+    print("  create_index <имя_таблицы> <столбец> - создать индекс по столбцу")
+    msg = "  convert_table <имя_таблицы> <json|columnar|paged>"
+    msg += " - сменить формат хранения"
+    print(msg)
+    print("  migrate [имя_таблицы ...] - перевести JSON-таблицы в страничный формат")
     print("  insert <имя_таблицы> <значение1> <значение2> ... - добавить запись")
-    print("  select <имя_таблицы> [WHERE условие] - выбрать записи")
+    print("  import <имя_таблицы> <файл.csv|файл.jsonl> - загрузить записи из файла")
+    print("  export <имя_таблицы> <файл.csv|файл.jsonl> - выгрузить записи в файл")
+    msg = "  select <имя_таблицы> [WHERE условие] [LIMIT n] [OFFSET n]"
+    msg += " [FORMAT table|tsv|jsonl] - выбрать записи"
+    print(msg)
+    msg = "  select <таблица1> JOIN <таблица2> ON <таблица1>.<столбец>"
+    msg += " = <таблица2>.<столбец> [WHERE условие] - соединить таблицы"
+    print(msg)
+    msg = "  select <имя_таблицы> COUNT(*) SUM|AVG|MIN|MAX(столбец) ..."
+    msg += " [WHERE условие] [GROUP BY столбец] - агрегатные функции"
+    print(msg)
     msg = "  update <имя_таблицы> SET <столбец=значение>"
     msg += " [WHERE условие] - обновить записи"
     print(msg)
     print("  delete <имя_таблицы> [WHERE условие] - удалить записи")
+    print("  analyze <имя_таблицы> - собрать статистику для выбора плана запроса")
+    print("  explain select <имя_таблицы> ... - показать план запроса")
 
     print("\nОбщие команды:")
+    print("  stats - статистика кэша, блокировок и метрики операций")
+    msg = "  stats reset | on | off | save <файл.json>"
+    msg += " - сбросить, включить, выключить или сохранить метрики"
+    print(msg)
+    print("  profile <команда> [аргументы ...] - выполнить команду под cProfile")
+    print("  group_commit <n> - один fsync журнала на n изменений (0 - выключить)")
+    msg = "  parallel <n> [мин_строк] - сканировать большие таблицы"
+    msg += " в n процессах (1 - выключить)"
+    print(msg)
+    print("  begin - начать транзакцию")
+    msg = "  commit - зафиксировать транзакцию или записать на диск изменения,"
+    msg += " накопленные в пакетном режиме"
+    print(msg)
+    print("  rollback - отменить изменения транзакции")
     print("  exit - выход из программы")
     print("  help - справочная информация")
 
@@ -226,6 +725,12 @@ def print_help():
     print("  create_table users name:str age:int active:bool")
     print('  insert users "John Doe" 25 true')
     print('  select users WHERE "age > 20"')
+    print('  select users WHERE "age > 20" AND NOT "active = false"')
+    print('  select users WHERE "age > 20" LIMIT 10 OFFSET 20 FORMAT tsv')
+    print('  select users COUNT(*) AVG(age) WHERE "age > 20" GROUP BY active')
+    msg = "  select users JOIN orders ON users.ID = orders.user_id"
+    msg += ' WHERE "users.age > 20"'
+    print(msg)
     print('  update users SET "active = false" WHERE "name = John Doe"')
     print('  delete users WHERE "active = false"')
     print()
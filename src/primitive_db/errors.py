@@ -0,0 +1,36 @@
+# Текст исключения - готовое сообщение для пользователя, интерфейс командной
+# строки выводит его как есть
+
+
+class DatabaseError(Exception):
+    pass
+
+
+class TableExistsError(DatabaseError):
+    pass
+
+
+class TableNotFoundError(DatabaseError):
+    pass
+
+
+class SchemaError(DatabaseError, ValueError):
+    pass
+
+
+class ValidationError(DatabaseError, ValueError):
+    pass
+
+
+class QueryError(DatabaseError, ValueError):
+    pass
+
+
+class TransactionError(DatabaseError):
+    pass
+
+
+class CorruptedFileError(DatabaseError, ValueError):
+    def __init__(self, file_path, error):
+        super().__init__(f'файл "{file_path}" поврежден ({error})')
+        self.file_path = file_path
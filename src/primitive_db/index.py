@@ -0,0 +1,157 @@
+import sys
+from bisect import bisect_left, bisect_right
+
+from .constants import LOG_DELETE, LOG_INSERT, LOG_UPDATE
+
+
+class ColumnIndex:
+    def __init__(self, column, column_type):
+        self.column = column
+        self.column_type = column_type
+        self.values = {}
+        self.buckets = {}
+        self.sorted_values = []
+        self.sorted_ids = []
+
+    @classmethod
+    def build(cls, column, column_type, table_data):
+        index = cls(column, column_type)
+        entries = sorted(
+            (record[column], record['ID'])
+            for record in table_data
+            if column in record
+        )
+        index._load_entries(entries)
+        return index
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["column"], data["type"])
+        index._load_entries(data["entries"])
+        return index
+
+    def to_dict(self):
+        return {
+            "column": self.column,
+            "type": self.column_type,
+            "entries": [
+                [value, record_id]
+                for value, record_id in zip(self.sorted_values, self.sorted_ids)
+            ],
+        }
+
+    def _load_entries(self, entries):
+        for value, record_id in entries:
+            self.values[record_id] = value
+            self.buckets.setdefault(value, []).append(record_id)
+            self.sorted_values.append(value)
+            self.sorted_ids.append(record_id)
+
+    def add(self, record):
+        if self.column not in record:
+            return
+
+        value = record[self.column]
+        record_id = record['ID']
+        self.values[record_id] = value
+        self.buckets.setdefault(value, []).append(record_id)
+
+        position = bisect_right(self.sorted_values, value)
+        self.sorted_values.insert(position, value)
+        self.sorted_ids.insert(position, record_id)
+
+    def remove(self, record_id):
+        if record_id not in self.values:
+            return
+
+        value = self.values.pop(record_id)
+        bucket = self.buckets[value]
+        bucket.remove(record_id)
+        if not bucket:
+            del self.buckets[value]
+
+        start = bisect_left(self.sorted_values, value)
+        end = bisect_right(self.sorted_values, value, start)
+        position = self.sorted_ids.index(record_id, start, end)
+        del self.sorted_values[position]
+        del self.sorted_ids[position]
+
+    def update(self, record):
+        self.remove(record['ID'])
+        self.add(record)
+
+    def apply_log_entry(self, entry):
+        operation = entry.get("op")
+        if operation in (LOG_INSERT, LOG_UPDATE):
+            self.update(entry["row"])
+        elif operation == LOG_DELETE:
+            self.remove(entry["id"])
+
+    def memory_size(self):
+        return (
+            sys.getsizeof(self.values)
+            + sys.getsizeof(self.buckets)
+            + sys.getsizeof(self.sorted_values)
+            + sys.getsizeof(self.sorted_ids)
+        )
+
+    def lookup(self, operator, value):
+        if operator == "=":
+            return list(self.buckets.get(value, []))
+        if operator == ">":
+            return self.sorted_ids[bisect_right(self.sorted_values, value):]
+        if operator == ">=":
+            return self.sorted_ids[bisect_left(self.sorted_values, value):]
+        if operator == "<":
+            return self.sorted_ids[:bisect_left(self.sorted_values, value)]
+        if operator == "<=":
+            return self.sorted_ids[:bisect_right(self.sorted_values, value)]
+        return None
+
+
+class PrimaryIndex:
+    column = "ID"
+    column_type = "int"
+
+    def __init__(self, table_data):
+        self.rows = {record['ID']: record for record in table_data}
+        # Строки добавляются в конец таблицы, и обычно ID растут вместе с
+        # ними. Если порядок нарушен (старые данные, ручная правка), чтение
+        # таблицы подряд уже не дает порядка по ID
+        record_ids = list(self.rows)
+        self.ordered = all(
+            previous < current
+            for previous, current in zip(record_ids, record_ids[1:])
+        ) and len(record_ids) == len(table_data)
+        self.last_id = record_ids[-1] if record_ids else None
+
+    def apply_log_entry(self, entry):
+        operation = entry.get("op")
+        if operation == LOG_INSERT:
+            self.add_id(entry["row"]['ID'])
+        if operation in (LOG_INSERT, LOG_UPDATE):
+            self.rows[entry["row"]['ID']] = entry["row"]
+        elif operation == LOG_DELETE:
+            self.rows.pop(entry["id"], None)
+
+    def add_id(self, record_id):
+        if record_id in self.rows:
+            self.ordered = False
+        elif self.last_id is not None and record_id < self.last_id:
+            self.ordered = False
+        else:
+            self.last_id = record_id
+
+    def memory_size(self):
+        return sys.getsizeof(self.rows)
+
+    def lookup(self, operator, value):
+        if operator != "=":
+            return None
+        return [value] if value in self.rows else []
+
+    def get_records(self, record_ids):
+        return [
+            self.rows[record_id] for record_id in record_ids
+            if record_id in self.rows
+        ]
@@ -0,0 +1,158 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+from .constants import LOCK_EXTENSION, LOCK_RETRY_INTERVAL
+from .storage import get_meta_path, get_table_file_path
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl есть только в POSIX-системах - без него блокировки не ставятся
+    fcntl = None
+
+held_locks = {}
+# Пока процесс удерживает блокировки между командами (пакет, транзакция),
+# ожидание новых блокировок ограничено: flock не находит взаимных
+# блокировок. on_timeout отпускает удерживаемые блокировки и сообщает
+# об ошибке
+lock_waits = {"timeout": None, "on_timeout": None}
+lock_stats = {
+    mode: {"acquired": 0, "contended": 0, "wait_total": 0.0, "wait_max": 0.0}
+    for mode in ("shared", "exclusive")
+}
+
+
+def get_lock_path(table_name):
+    return get_table_file_path(table_name, LOCK_EXTENSION)
+
+
+def get_metadata_lock_path():
+    return f"{get_meta_path()}{LOCK_EXTENSION}"
+
+
+def wait_for_lock(lock_fd, exclusive, timeout=None):
+    mode = "exclusive" if exclusive else "shared"
+    operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    stats = lock_stats[mode]
+    stats["acquired"] += 1
+
+    try:
+        fcntl.flock(lock_fd, operation | fcntl.LOCK_NB)
+        return
+    except BlockingIOError:
+        stats["contended"] += 1
+
+    start_time = time.monotonic()
+    try:
+        if timeout is None:
+            fcntl.flock(lock_fd, operation)
+        else:
+            retry_lock(lock_fd, operation, start_time + timeout)
+    finally:
+        record_wait(stats, time.monotonic() - start_time)
+
+
+def retry_lock(lock_fd, operation, deadline):
+    while True:
+        try:
+            fcntl.flock(lock_fd, operation | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(lock_fd) from None
+        time.sleep(LOCK_RETRY_INTERVAL)
+
+
+def record_wait(stats, wait_time):
+    stats["wait_total"] += wait_time
+    stats["wait_max"] = max(stats["wait_max"], wait_time)
+
+
+def limit_lock_waits(timeout, on_timeout=None):
+    lock_waits["timeout"] = timeout
+    lock_waits["on_timeout"] = on_timeout
+
+
+def acquire_lock(lock_path, exclusive=False):
+    if fcntl is None:
+        return
+
+    timeout = lock_waits["timeout"]
+    # Блокировка повторно входима в пределах процесса: flock на втором
+    # дескрипторе того же файла заблокировал бы сам себя
+    held = held_locks.get(lock_path)
+    if held is not None:
+        if exclusive and not held["exclusive"]:
+            try:
+                wait_for_lock(held["fd"], exclusive=True, timeout=timeout)
+            except TimeoutError:
+                handle_lock_timeout(lock_path)
+                raise
+            held["exclusive"] = True
+        held["depth"] += 1
+        return
+
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        wait_for_lock(lock_fd, exclusive, timeout)
+    except TimeoutError:
+        os.close(lock_fd)
+        handle_lock_timeout(lock_path)
+        raise
+    except BaseException:
+        os.close(lock_fd)
+        raise
+    held_locks[lock_path] = {"fd": lock_fd, "exclusive": exclusive, "depth": 1}
+
+
+def handle_lock_timeout(lock_path):
+    on_timeout = lock_waits["on_timeout"]
+    if on_timeout is not None:
+        on_timeout(lock_path)
+
+
+def release_lock(lock_path):
+    held = held_locks.get(lock_path)
+    if held is None:
+        return
+
+    held["depth"] -= 1
+    if held["depth"] == 0:
+        del held_locks[lock_path]
+        fcntl.flock(held["fd"], fcntl.LOCK_UN)
+        os.close(held["fd"])
+
+
+@contextmanager
+def file_lock(lock_path, exclusive=False):
+    acquire_lock(lock_path, exclusive)
+    try:
+        yield
+    finally:
+        release_lock(lock_path)
+
+
+def table_lock(table_name, exclusive=False):
+    return file_lock(get_lock_path(table_name), exclusive)
+
+
+def metadata_lock(exclusive=False):
+    return file_lock(get_metadata_lock_path(), exclusive)
+
+
+def locked_table(exclusive=False):
+    # Первым аргументом функции должно быть имя таблицы
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(table_name, *args, **kwargs):
+            with table_lock(table_name, exclusive):
+                return func(table_name, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_lock_stats():
+    return {mode: dict(stats) for mode, stats in lock_stats.items()}
@@ -1,10 +1,77 @@
 #!/usr/bin/env python3
+import argparse
+import sys
 
-from .engine import run
+from ..decorators import set_assume_yes
+from .constants import SERVER_HOST, SERVER_PORT
+from .engine import run, run_script
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        prog="project", description="Примитивная база данных"
+    )
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=["serve", "connect"],
+        help="serve - запустить сервер, connect - подключиться к серверу",
+    )
+    parser.add_argument(
+        "--exec",
+        dest="script",
+        metavar="FILE",
+        help="выполнить команды из файла и выйти",
+    )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="не запрашивать подтверждение опасных операций",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="выполнить команду и показать, сколько времени заняли импорты",
+    )
+    parser.add_argument("--host", default=SERVER_HOST, help="адрес сервера")
+    parser.add_argument(
+        "--port", type=int, default=SERVER_PORT, help="порт сервера"
+    )
+    return parser.parse_args()
 
 
 def main():
-    run()
+    arguments = parse_arguments()
+    set_assume_yes(arguments.yes)
+
+    # Сервер, клиент и профилировщик импортируются только по запросу, чтобы
+    # не замедлять запуск обычных сценариев
+    if arguments.startup_profile:
+        from .startup import profile_startup
+
+        child_arguments = [
+            argument for argument in sys.argv[1:] if argument != "--startup-profile"
+        ]
+        sys.exit(profile_startup(child_arguments))
+    elif arguments.mode == "serve":
+        from .server import serve
+
+        serve(arguments.host, arguments.port)
+    elif arguments.mode == "connect":
+        from .client import connect
+
+        connect(arguments.host, arguments.port)
+    elif arguments.script:
+        try:
+            with open(arguments.script, 'r', encoding='utf-8') as file:
+                sys.exit(run_script(file))
+        except OSError as error:
+            print(f"Ошибка: Не удалось прочитать сценарий - {error}")
+            sys.exit(1)
+    elif not sys.stdin.isatty():
+        sys.exit(run_script(sys.stdin))
+    else:
+        run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from .constants import (
+    LATENCY_BUCKETS_PER_OCTAVE,
+    LATENCY_MIN_SECONDS,
+    METRICS_COUNTERS,
+    METRICS_ENV,
+)
+
+
+class OperationMetrics:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets = {}
+        self.counters = dict.fromkeys(METRICS_COUNTERS, 0)
+
+    def observe(self, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        bucket = get_latency_bucket(elapsed)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(get_bucket_upper_bound(bucket), self.max_time)
+        return self.max_time
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_seconds": self.total_time,
+            "max_seconds": self.max_time,
+            "p50_seconds": self.percentile(0.50),
+            "p95_seconds": self.percentile(0.95),
+            "p99_seconds": self.percentile(0.99),
+            **self.counters,
+        }
+
+
+def get_latency_bucket(elapsed):
+    # Логарифмические интервалы: память не зависит от числа замеров, а
+    # перцентиль получается с точностью до ширины интервала (~19%)
+    if elapsed <= LATENCY_MIN_SECONDS:
+        return 0
+    octaves = math.log2(elapsed / LATENCY_MIN_SECONDS)
+    return int(octaves * LATENCY_BUCKETS_PER_OCTAVE) + 1
+
+
+def get_bucket_upper_bound(bucket):
+    return LATENCY_MIN_SECONDS * 2 ** (bucket / LATENCY_BUCKETS_PER_OCTAVE)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.operations = {}
+        self.operation = None
+        self.table_name = "-"
+
+    def get(self, operation, table_name):
+        key = (operation, table_name)
+        operation_metrics = self.operations.get(key)
+        if operation_metrics is None:
+            operation_metrics = self.operations[key] = OperationMetrics()
+        return operation_metrics
+
+    @contextmanager
+    def command(self, operation, table_name="-"):
+        # Счетчики, накопленные во время команды, относятся к ней и ее таблице
+        if not self.enabled:
+            yield
+            return
+
+        previous = (self.operation, self.table_name)
+        self.operation, self.table_name = operation, table_name
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.get(operation, table_name).observe(time.perf_counter() - start_time)
+            self.operation, self.table_name = previous
+
+    def observe(self, operation, elapsed):
+        if self.enabled:
+            self.get(operation, self.table_name).observe(elapsed)
+
+    def add(self, counter, value):
+        # Вне команды (например, чтение метаданных при открытии базы)
+        # счетчики относить не к чему
+        if self.enabled and self.operation is not None:
+            self.get(self.operation, self.table_name).counters[counter] += value
+
+    @contextmanager
+    def timer(self, counter):
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(counter, time.perf_counter() - start_time)
+
+    def reset(self):
+        self.operations.clear()
+
+    def to_dict(self):
+        return [
+            {"operation": operation, "table": table_name, **metrics.to_dict()}
+            for (operation, table_name), metrics in sorted(self.operations.items())
+        ]
+
+    def dump(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+
+
+metrics = MetricsRegistry(os.environ.get(METRICS_ENV, "1") != "0")
@@ -0,0 +1,153 @@
+import json
+import mmap
+import struct
+import sys
+
+from .constants import PAGE_ROWS, PAGED_MAGIC
+
+HEADER_FORMAT = "<8sQII"
+DIRECTORY_FORMAT = "<QIIqq"
+INT_FORMAT = struct.Struct("<q")
+BOOL_FORMAT = struct.Struct("<?")
+LENGTH_FORMAT = struct.Struct("<I")
+
+
+def encode_value(value, column_type):
+    if column_type == "int":
+        return INT_FORMAT.pack(value)
+    if column_type == "bool":
+        return BOOL_FORMAT.pack(value)
+    encoded = value.encode('utf-8')
+    return LENGTH_FORMAT.pack(len(encoded)) + encoded
+
+
+def encode_page(schema, records):
+    row_offsets = []
+    rows = bytearray()
+    for record in records:
+        row_offsets.append(len(rows))
+        for column, column_type in schema.items():
+            rows += encode_value(record[column], column_type)
+    row_offsets.append(len(rows))
+
+    offsets = struct.pack(f"<{len(row_offsets)}I", *row_offsets)
+    return LENGTH_FORMAT.pack(len(records)) + offsets + bytes(rows)
+
+
+def encode_paged_table(schema, records):
+    schema_bytes = json.dumps(schema, ensure_ascii=False).encode('utf-8')
+    pages = []
+    directory = []
+    for start in range(0, len(records), PAGE_ROWS):
+        page_records = records[start:start + PAGE_ROWS]
+        record_ids = [record['ID'] for record in page_records]
+        pages.append(encode_page(schema, page_records))
+        directory.append((len(page_records), min(record_ids), max(record_ids)))
+
+    header_size = struct.calcsize(HEADER_FORMAT) + len(schema_bytes)
+    offset = header_size + struct.calcsize(DIRECTORY_FORMAT) * len(pages)
+
+    output = bytearray(struct.pack(
+        HEADER_FORMAT, PAGED_MAGIC, len(records), len(pages), len(schema_bytes)
+    ))
+    output += schema_bytes
+    for page, (row_count, min_id, max_id) in zip(pages, directory):
+        output += struct.pack(
+            DIRECTORY_FORMAT, offset, len(page), row_count, min_id, max_id
+        )
+        offset += len(page)
+    for page in pages:
+        output += page
+    return bytes(output)
+
+
+class PagedTable:
+    def __init__(self, source, schema, row_count, directory):
+        self.source = source
+        self.schema = schema
+        self.row_count = row_count
+        self.directory = directory
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, row_count, page_count, schema_length = struct.unpack_from(
+            HEADER_FORMAT, source, 0
+        )
+        if magic != PAGED_MAGIC:
+            raise ValueError(f'файл "{file_path}" не является страничной таблицей')
+
+        position = struct.calcsize(HEADER_FORMAT)
+        schema = json.loads(source[position:position + schema_length])
+        position += schema_length
+
+        directory_size = struct.calcsize(DIRECTORY_FORMAT)
+        directory = [
+            struct.unpack_from(
+                DIRECTORY_FORMAT, source, position + page * directory_size
+            )
+            for page in range(page_count)
+        ]
+        return cls(source, schema, row_count, directory)
+
+    @property
+    def page_count(self):
+        return len(self.directory)
+
+    def memory_size(self):
+        return sys.getsizeof(self.directory) + sys.getsizeof(self)
+
+    def find_pages(self, operator, record_id):
+        # Каталог хранит диапазон ID каждой страницы - остальные страницы
+        # не читаются вовсе
+        checks = {
+            "=": lambda low, high: low <= record_id <= high,
+            ">": lambda low, high: high > record_id,
+            ">=": lambda low, high: high >= record_id,
+            "<": lambda low, high: low < record_id,
+            "<=": lambda low, high: low <= record_id,
+        }
+        check = checks.get(operator)
+        if check is None:
+            return range(self.page_count)
+        return [
+            page for page, (_, _, _, low, high) in enumerate(self.directory)
+            if check(low, high)
+        ]
+
+    def decode_row(self, position):
+        source = self.source
+        record = {}
+        for column, column_type in self.schema.items():
+            if column_type == "int":
+                record[column] = INT_FORMAT.unpack_from(source, position)[0]
+                position += INT_FORMAT.size
+            elif column_type == "bool":
+                record[column] = BOOL_FORMAT.unpack_from(source, position)[0]
+                position += BOOL_FORMAT.size
+            else:
+                (length,) = LENGTH_FORMAT.unpack_from(source, position)
+                position += LENGTH_FORMAT.size
+                record[column] = source[position:position + length].decode('utf-8')
+                position += length
+        return record
+
+    def iter_page(self, page):
+        offset, _, row_count, _, _ = self.directory[page]
+        row_offsets = struct.unpack_from(
+            f"<{row_count + 1}I", self.source, offset + LENGTH_FORMAT.size
+        )
+        rows_start = offset + LENGTH_FORMAT.size * (row_count + 2)
+        for row_offset in row_offsets[:-1]:
+            yield self.decode_row(rows_start + row_offset)
+
+    def iter_records(self, pages=None):
+        if pages is None:
+            pages = range(self.page_count)
+        for page in pages:
+            yield from self.iter_page(page)
+
+    def to_records(self):
+        return list(self.iter_records())
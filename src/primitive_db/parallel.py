@@ -0,0 +1,76 @@
+import os
+from itertools import chain
+
+from .constants import (
+    PARALLEL_CHUNKS_PER_WORKER,
+    PARALLEL_SCAN_ROWS,
+    PARALLEL_SCAN_ROWS_ENV,
+    PARALLEL_WORKERS_ENV,
+)
+
+
+def get_env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+parallel_scan = {
+    "workers": get_env_int(PARALLEL_WORKERS_ENV, os.cpu_count() or 1),
+    "min_rows": get_env_int(PARALLEL_SCAN_ROWS_ENV, PARALLEL_SCAN_ROWS),
+}
+shared_scan = {}
+
+
+def set_parallel_scan(workers, min_rows=None):
+    parallel_scan["workers"] = max(workers, 1)
+    if min_rows is not None:
+        parallel_scan["min_rows"] = max(min_rows, 0)
+
+
+def get_fork_context():
+    # multiprocessing нужен только для больших таблиц, а его импорт заметно
+    # удлиняет запуск
+    import multiprocessing
+
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+def should_scan_in_parallel(row_count):
+    return (
+        parallel_scan["workers"] > 1
+        and row_count >= parallel_scan["min_rows"]
+        and get_fork_context() is not None
+    )
+
+
+def split_range(count, parts):
+    chunk_size = max(-(-count // parts), 1)
+    return [
+        (start, min(start + chunk_size, count))
+        for start in range(0, count, chunk_size)
+    ]
+
+
+def run_parallel_scan(task, source, where_clause, count):
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Таблица достается рабочим процессам через fork без сериализации:
+    # туда передаются только границы частей, обратно - найденные строки
+    workers = parallel_scan["workers"]
+    chunks = split_range(count, workers * PARALLEL_CHUNKS_PER_WORKER)
+    shared_scan["source"] = source
+    shared_scan["where"] = where_clause
+
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_fork_context()) as executor:
+            results = list(executor.map(task, chunks))
+    finally:
+        shared_scan.clear()
+
+    # Части идут по порядку, поэтому результат остается упорядоченным по ID
+    return chain.from_iterable(results)
@@ -1,52 +1,359 @@
+import re
 import shlex
 
+from .constants import (
+    AGGREGATE_FUNCTIONS,
+    ERROR_JOIN_FORMAT,
+    ERROR_WHERE_FORMAT,
+    LOGIC_KEYWORDS,
+    OUTPUT_FORMATS,
+    SELECT_KEYWORDS,
+)
+from .errors import QueryError
+
+# Логические слова пишутся в любом регистре; за ними может сразу идти скобка
+LOGIC_WORD_PATTERN = re.compile(r'(AND|OR|NOT)(?=\s|\(|$)', re.IGNORECASE)
+LOGIC_SEPARATOR_PATTERN = re.compile(r'\s+(AND|OR)(?=\s|\()\s*', re.IGNORECASE)
+COMPARISON_START_PATTERN = re.compile(r'\s*[^\s<>=()]+\s*(>=|<=|>|<|=)')
+COMPARISON_PATTERN = re.compile(r'^([^<>=]*?)\s*(>=|<=|>|<|=)\s*(.*)$', re.DOTALL)
+OPERATOR_PATTERN = re.compile(r'>=|<=|>|<|=')
+QUOTES = ('"', "'")
+AGGREGATE_PATTERN = re.compile(
+    r'^({})\(\s*(\*|[^()\s,]+)\s*\),?$'.format("|".join(AGGREGATE_FUNCTIONS)),
+    re.IGNORECASE,
+)
+
 
 def parse_where_condition(where_string):
     if not where_string:
         return None
 
+    try:
+        return parse_where(where_string)
+    except QueryError as error:
+        print(error)
+        return None
+
+
+def parse_where(where_string):
     try:
         where_string = where_string.replace("WHERE", "").strip()
-        
-        operators = ['>=', '<=', '>', '<', '=']
-        operator = None
-        
-        for op in operators:
-            if op in where_string:
-                operator = op
-                break
-        
-        if not operator:
-            msg = "Ошибка: Некорректный формат условия WHERE."
-            msg += " Используйте: column оператор value"
-            print(msg)
+        tokens = tokenize_where(where_string)
+        if not tokens:
+            raise QueryError(ERROR_WHERE_FORMAT)
+
+        condition, position = parse_logic_expression(tokens, 0)
+        if position != len(tokens):
+            raise QueryError(ERROR_WHERE_FORMAT)
+        return condition
+    except QueryError:
+        raise
+    except Exception as error:
+        raise QueryError(f"Ошибка разбора условия WHERE: {error}") from error
+
+
+def tokenize_where(where_string):
+    # Скобки и AND/OR/NOT делят условие только между сравнениями: в значении
+    # справа от оператора они остаются обычным текстом
+    tokens = []
+    depth = 0
+    position = 0
+    while True:
+        while position < len(where_string) and where_string[position].isspace():
+            position += 1
+        if position >= len(where_string):
+            return tokens
+
+        char = where_string[position]
+        keyword = match_logic_word(where_string, position)
+        if char in "()":
+            depth += 1 if char == "(" else -1
+            tokens.append(char)
+            position += 1
+        elif keyword:
+            tokens.append(keyword.group(1).upper())
+            position = keyword.end()
+        else:
+            end = find_comparison_end(where_string, position, depth)
+            tokens.append(where_string[position:end].strip())
+            position = end
+
+
+def match_logic_word(where_string, position):
+    # Столбец может называться "and" или "not": слово перед оператором
+    # сравнения - начало условия, а не логическая связка
+    if COMPARISON_START_PATTERN.match(where_string, position):
+        return None
+    return LOGIC_WORD_PATTERN.match(where_string, position)
+
+
+def find_comparison_end(where_string, position, depth):
+    operator = OPERATOR_PATTERN.search(where_string, position)
+    if operator is None:
+        return len(where_string)
+
+    index = operator.end()
+    while index < len(where_string) and where_string[index].isspace():
+        index += 1
+    value_start = index
+    balance = 0
+    while index < len(where_string):
+        char = where_string[index]
+        if char in QUOTES and index == value_start:
+            closing = where_string.find(char, index + 1)
+            index = len(where_string) if closing == -1 else closing + 1
+            continue
+
+        if char == "(":
+            balance += 1
+        elif char == ")":
+            if balance == 0 and depth > 0:
+                # Скобка закрывает группу условий, а не часть значения
+                return index
+            balance = max(balance - 1, 0)
+        elif char.isspace() and balance == 0:
+            separator = LOGIC_SEPARATOR_PATTERN.match(where_string, index)
+            if separator and starts_condition(where_string, separator.end()):
+                return index
+        index += 1
+    return index
+
+
+def starts_condition(where_string, position):
+    # "name = Tom AND Jerry" - одно значение, а "name = Tom AND age > 5" -
+    # два сравнения: после AND/OR должно начинаться новое условие
+    rest = where_string[position:].lstrip()
+    offset = len(where_string) - len(rest)
+    if rest.startswith("("):
+        return starts_condition(where_string, offset + 1)
+    keyword = match_logic_word(rest, 0)
+    if keyword and keyword.group(1).upper() == "NOT":
+        return starts_condition(where_string, offset + keyword.end())
+    return COMPARISON_START_PATTERN.match(rest) is not None
+
+
+def parse_logic_expression(tokens, position):
+    return parse_logic_chain(tokens, position, "OR", parse_and_expression)
+
+
+def parse_and_expression(tokens, position):
+    return parse_logic_chain(tokens, position, "AND", parse_not_expression)
+
+
+def parse_logic_chain(tokens, position, keyword, parse_operand):
+    condition, position = parse_operand(tokens, position)
+    conditions = [condition]
+    while position < len(tokens) and tokens[position] == keyword:
+        condition, position = parse_operand(tokens, position + 1)
+        conditions.append(condition)
+
+    if len(conditions) == 1:
+        return conditions[0], position
+    return {"_logic": keyword, "_conditions": conditions}, position
+
+
+def parse_not_expression(tokens, position):
+    if position >= len(tokens):
+        raise QueryError(ERROR_WHERE_FORMAT)
+
+    token = tokens[position]
+    if token == "NOT":
+        condition, position = parse_not_expression(tokens, position + 1)
+        return {"_logic": "NOT", "_conditions": [condition]}, position
+
+    if token == "(":
+        condition, position = parse_logic_expression(tokens, position + 1)
+        if position >= len(tokens) or tokens[position] != ")":
+            raise QueryError(ERROR_WHERE_FORMAT)
+        return condition, position + 1
+
+    if token in LOGIC_KEYWORDS:
+        raise QueryError(ERROR_WHERE_FORMAT)
+
+    return parse_comparison(token), position + 1
+
+
+def parse_comparison(condition_string):
+    # Оператор - первый после имени столбца, в значении могут встречаться
+    # и другие символы сравнения
+    match = COMPARISON_PATTERN.match(condition_string)
+    if match is None:
+        raise QueryError(ERROR_WHERE_FORMAT)
+
+    column, operator, value = match.groups()
+    column = column.strip()
+    value = value.strip()
+
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+    elif value.startswith("'") and value.endswith("'"):
+        value = value[1:-1]
+
+    return {column: value, "_operator": operator}
+
+
+def parse_select_query(arguments):
+    aggregates = parse_aggregates(arguments)
+    if aggregates is None:
+        return None
+    arguments = arguments[len(aggregates):]
+
+    clauses = {}
+    current_keyword = "WHERE"
+    for argument in arguments:
+        keyword = argument.upper()
+        if keyword in SELECT_KEYWORDS:
+            if keyword in clauses:
+                print(f"Ошибка: Ключевое слово {keyword} указано дважды.")
+                return None
+            current_keyword = keyword
+            clauses[keyword] = []
+        else:
+            clauses.setdefault(current_keyword, []).append(argument)
+
+    query = {
+        "aggregates": aggregates,
+        "join": None,
+        "group_by": [],
+        "order_by": None,
+        "descending": False,
+        "where": None,
+        "limit": None,
+        "offset": 0,
+        "format": "table",
+    }
+
+    if "JOIN" in clauses or "ON" in clauses:
+        join = parse_join_clause(clauses.get("JOIN", []), clauses.get("ON", []))
+        if join is None:
+            return None
+        if aggregates:
+            print("Ошибка: Агрегатные функции не поддерживаются вместе с JOIN.")
             return None
+        query["join"] = join
 
-        parts = where_string.split(operator, 1)
-        if len(parts) != 2:
-            msg = "Ошибка: Некорректный формат условия WHERE."
-            msg += " Используйте: column оператор value"
+    if "WHERE" in clauses:
+        query["where"] = parse_where_condition(' '.join(clauses["WHERE"]))
+        if query["where"] is None:
+            if not clauses["WHERE"]:
+                print(ERROR_WHERE_FORMAT)
+            return None
+
+    if "GROUP" in clauses:
+        group_by = parse_group_by(clauses["GROUP"])
+        if group_by is None:
+            return None
+        if not aggregates:
+            print("Ошибка: GROUP BY используется только с агрегатными функциями.")
+            return None
+        query["group_by"] = group_by
+
+    if "ORDER" in clauses:
+        order = parse_order_by(clauses["ORDER"])
+        if order is None:
+            return None
+        query["order_by"], query["descending"] = order
+
+    for keyword in ("LIMIT", "OFFSET"):
+        if keyword in clauses:
+            values = clauses[keyword]
+            if len(values) != 1 or not values[0].isdigit():
+                print(f"Ошибка: {keyword} ожидает неотрицательное целое число.")
+                return None
+            query[keyword.lower()] = int(values[0])
+
+    if "FORMAT" in clauses:
+        values = clauses["FORMAT"]
+        if len(values) != 1 or values[0].lower() not in OUTPUT_FORMATS:
+            msg = "Ошибка: Неизвестный формат вывода."
+            msg += f" Доступные форматы: {', '.join(OUTPUT_FORMATS)}."
             print(msg)
             return None
+        query["format"] = values[0].lower()
 
-        column = parts[0].strip()
-        value = parts[1].strip()
-        
-        if value.startswith('"') and value.endswith('"'):
-            value = value[1:-1]
-        elif value.startswith("'") and value.endswith("'"):
-            value = value[1:-1]
-        
-        return {column: value, "_operator": operator}
-    except Exception as error:
-        print(f"Ошибка разбора условия WHERE: {error}")
+    return query
+
+
+def parse_join_clause(join_values, on_values):
+    if len(join_values) != 1 or not on_values:
+        print(ERROR_JOIN_FORMAT)
         return None
+    return {"table": join_values[0], "on": " ".join(on_values)}
+
+
+def parse_join_condition(on_string, left_table, right_table):
+    # Стороны условия ON можно указать в любом порядке
+    parts = on_string.split("=")
+    if len(parts) != 2:
+        raise QueryError(ERROR_JOIN_FORMAT)
+
+    columns = {}
+    for part in parts:
+        table_name, _, column = part.strip().partition(".")
+        if not column or table_name in columns:
+            raise QueryError(ERROR_JOIN_FORMAT)
+        if table_name not in (left_table, right_table):
+            raise QueryError(ERROR_JOIN_FORMAT)
+        columns[table_name] = column
+    return columns[left_table], columns[right_table]
+
+
+def parse_aggregates(arguments):
+    aggregates = []
+    for argument in arguments:
+        match = AGGREGATE_PATTERN.match(argument)
+        if match is None:
+            break
+
+        function = match.group(1).upper()
+        column = match.group(2)
+        if column == "*" and function != "COUNT":
+            print(f"Ошибка: {function} ожидает имя столбца, а не *.")
+            return None
+        aggregates.append((function, column))
+    return aggregates
+
+
+def parse_group_by(values):
+    if not values or values[0].upper() != "BY":
+        print("Ошибка: Ожидается GROUP BY <столбец>[, <столбец> ...].")
+        return None
+
+    columns = [
+        column.strip()
+        for column in ",".join(values[1:]).split(",")
+        if column.strip()
+    ]
+    if not columns:
+        print("Ошибка: Ожидается GROUP BY <столбец>[, <столбец> ...].")
+        return None
+    return columns
+
+
+def parse_order_by(values):
+    if len(values) not in (2, 3) or values[0].upper() != "BY":
+        print("Ошибка: Ожидается ORDER BY <столбец> [ASC|DESC].")
+        return None
+
+    direction = values[2].upper() if len(values) == 3 else "ASC"
+    if direction not in ("ASC", "DESC"):
+        print("Ошибка: Ожидается ORDER BY <столбец> [ASC|DESC].")
+        return None
+    return values[1], direction == "DESC"
 
 
 def parse_set_clause(set_string):
     if not set_string:
         return None
 
+    try:
+        return parse_set(set_string)
+    except QueryError as error:
+        print(error)
+        return None
+
+
+def parse_set(set_string):
     try:
         set_string = set_string.replace("SET", "").strip()
         set_clause = {}
@@ -57,13 +364,11 @@ def parse_set_clause(set_string):
             if '=' not in clause:
                 msg = "Ошибка: Некорректный формат условия SET."
                 msg += " Используйте: column = value"
-                print(msg)
-                return None
+                raise QueryError(msg)
 
             parts = clause.split('=', 1)
             if len(parts) != 2:
-                print("Ошибка: Некорректный формат условия SET.")
-                return None
+                raise QueryError("Ошибка: Некорректный формат условия SET.")
 
             column = parts[0].strip()
             value = parts[1].strip()
@@ -76,9 +381,10 @@ def parse_set_clause(set_string):
             set_clause[column] = value
 
         return set_clause
+    except QueryError:
+        raise
     except Exception as error:
-        print(f"Ошибка разбора условия SET: {error}")
-        return None
+        raise QueryError(f"Ошибка разбора условия SET: {error}") from error
 
 
 def parse_insert_values(values_string):
@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import io
+import signal
+from contextlib import redirect_stdout, suppress
+
+from ..decorators import set_assume_yes
+from .constants import (
+    SERVER_DISABLED_COMMANDS,
+    SERVER_FLUSH_ENTRIES,
+    SERVER_FLUSH_INTERVAL,
+)
+from .engine import close_session, disable_commands, open_session, run_line
+from .errors import DatabaseError
+from .utils import count_deferred_entries
+
+# Протокол: клиент присылает по команде в строке, сервер отвечает строкой
+# с длиной вывода в байтах и самим выводом команды.
+#
+# Кэш таблиц, реестр блокировок и транзакция общие для процесса, поэтому
+# команды выполняются в потоке цикла событий по одной: запись одной таблицы
+# не перемешивается с другой записью или чтением. Изменения применяются к
+# таблицам в памяти и уходят на диск пакетами в отдельном потоке: цикл
+# событий при этом продолжает принимать соединения и запросы, а команды
+# ждут под state_lock только на время записи пакета
+
+
+def serve(host, port):
+    try:
+        asyncio.run(run_server(host, port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    print("Сервер остановлен.")
+
+
+async def run_server(host, port):
+    database = open_session(batch=True)
+    if database is None:
+        return
+
+    # Подтверждение запросить не у кого; транзакция общая для процесса
+    # и захватила бы всех клиентов сразу
+    set_assume_yes(True)
+    disable_commands(SERVER_DISABLED_COMMANDS, "недоступна на сервере")
+    state_lock = asyncio.Lock()
+    flusher = asyncio.create_task(flush_periodically(database, state_lock))
+    try:
+        server = await asyncio.start_server(
+            functools.partial(handle_client, database, state_lock), host, port
+        )
+    except OSError as error:
+        print(f"Ошибка: Не удалось открыть порт {port} - {error}")
+        flusher.cancel()
+        close_session(database)
+        return
+
+    # По SIGTERM сервер так же, как по Ctrl+C, записывает изменения на диск
+    with suppress(NotImplementedError):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+    print(f"Сервер слушает {host}:{port}. Ctrl+C - остановить.")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        flusher.cancel()
+        # Запись, начатая в потоке, завершается до закрытия сессии
+        async with state_lock:
+            close_session(database)
+
+
+async def handle_client(database, state_lock, reader, writer):
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Строка длиннее буфера чтения
+                writer.write(encode_response("Ошибка: Слишком длинная команда.\n"))
+                break
+            if not line:
+                break
+
+            async with state_lock:
+                output, keep_open = execute_request(database, line.decode('utf-8'))
+            writer.write(encode_response(output))
+            await writer.drain()
+            if count_deferred_entries() >= SERVER_FLUSH_ENTRIES:
+                await flush_changes(database, state_lock)
+            if not keep_open:
+                break
+    except (ConnectionError, UnicodeDecodeError):
+        pass
+    finally:
+        writer.close()
+
+
+def execute_request(database, line):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        keep_open = run_line(database, line.strip())
+    return output.getvalue(), keep_open
+
+
+def encode_response(output):
+    payload = output.encode('utf-8')
+    return f"{len(payload)}\n".encode('ascii') + payload
+
+
+async def flush_periodically(database, state_lock):
+    while True:
+        await asyncio.sleep(SERVER_FLUSH_INTERVAL)
+        await flush_changes(database, state_lock)
+
+
+async def flush_changes(database, state_lock):
+    async with state_lock:
+        future = asyncio.get_running_loop().run_in_executor(
+            None, commit_changes, database
+        )
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Остановка сервера не прерывает запись пакета
+            await future
+            raise
+
+
+def commit_changes(database):
+    try:
+        database.commit()
+    except DatabaseError as error:
+        # Незаписанные изменения остаются в памяти до следующей попытки
+        print(error)
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import time
+
+from .constants import PROFILE_TOP_ENTRIES
+
+MAIN_MODULE = f"{__package__}.main"
+IMPORT_TIME_PREFIX = "import time:"
+
+
+def profile_startup(arguments):
+    # Команда повторяется в дочернем процессе с -X importtime, а его отчет
+    # об импортах сворачивается в таблицу самых долгих модулей
+    command = [sys.executable, "-X", "importtime", "-m", MAIN_MODULE, *arguments]
+    start_time = time.perf_counter()
+    completed = subprocess.run(command, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start_time
+
+    imports, other_lines = parse_import_times(completed.stderr)
+    for line in other_lines:
+        print(line, file=sys.stderr)
+    print_import_times(imports, elapsed)
+    return completed.returncode
+
+
+def parse_import_times(output):
+    imports = []
+    other_lines = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            other_lines.append(line)
+            continue
+
+        fields = line[len(IMPORT_TIME_PREFIX):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Строка заголовка
+            continue
+        name = fields[2].rstrip()
+        imports.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self": int(fields[0]) / 1_000_000,
+            "cumulative": int(fields[1]) / 1_000_000,
+        })
+    return imports, other_lines
+
+
+def print_import_times(imports, elapsed):
+    from prettytable import PrettyTable
+
+    import_time = sum(item["cumulative"] for item in imports if item["depth"] == 0)
+    msg = f"\nЗапуск: {elapsed * 1000:.1f} мс, из них импорт модулей:"
+    msg += f" {import_time * 1000:.1f} мс ({len(imports)} модулей)."
+    print(msg)
+
+    table = PrettyTable()
+    table.field_names = ["Модуль", "Свое, мс", "Всего, мс"]
+    table.align["Модуль"] = "l"
+    slowest = sorted(imports, key=lambda item: item["cumulative"], reverse=True)
+    for item in slowest[:PROFILE_TOP_ENTRIES]:
+        table.add_row([
+            "  " * item["depth"] + item["module"],
+            f"{item['self'] * 1000:.2f}",
+            f"{item['cumulative'] * 1000:.2f}",
+        ])
+    print(table)
@@ -0,0 +1,152 @@
+import sys
+from bisect import bisect_right
+
+from .constants import (
+    HISTOGRAM_BUCKETS,
+    LOG_DELETE,
+    LOG_INSERT,
+    LOG_UPDATE,
+    RANGE_SELECTIVITY,
+    STATS_STALE_RATIO,
+)
+
+
+class TableStatistics:
+    def __init__(self, row_count=0, columns=None, modified=0):
+        self.row_count = row_count
+        self.columns = columns or {}
+        self.modified = modified
+
+    @classmethod
+    def build(cls, table_schema, table_data):
+        columns = {}
+        for column, column_type in table_schema.items():
+            values = sorted(record[column] for record in table_data if column in record)
+            column_stats = {
+                "distinct": len(set(values)),
+                "min": values[0] if values else None,
+                "max": values[-1] if values else None,
+            }
+            if column_type == "int" and values:
+                column_stats["histogram"] = build_histogram(values)
+            columns[column] = column_stats
+        return cls(len(table_data), columns)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["row_count"], data["columns"], data.get("modified", 0))
+
+    def to_dict(self):
+        return {
+            "row_count": self.row_count,
+            "modified": self.modified,
+            "columns": self.columns,
+        }
+
+    def apply_log_entry(self, entry):
+        # Число строк и границы значений поддерживаются точно, гистограмма -
+        # приближенно: для удаления в журнале есть только ID строки
+        operation = entry.get("op")
+        self.modified += 1
+        if operation == LOG_DELETE:
+            self.row_count = max(self.row_count - 1, 0)
+            return
+        if operation not in (LOG_INSERT, LOG_UPDATE):
+            return
+
+        if operation == LOG_INSERT:
+            self.row_count += 1
+        for column, value in entry["row"].items():
+            column_stats = self.columns.get(column)
+            if column_stats is None:
+                continue
+            if column_stats["min"] is None or value < column_stats["min"]:
+                column_stats["min"] = value
+            if column_stats["max"] is None or value > column_stats["max"]:
+                column_stats["max"] = value
+            if operation == LOG_INSERT and "histogram" in column_stats:
+                add_to_histogram(column_stats["histogram"], value)
+
+    def is_stale(self):
+        # Число различных значений и гистограмма не обновляются по журналу,
+        # поэтому после большого числа изменений оценкам нельзя доверять
+        return self.modified > self.row_count * STATS_STALE_RATIO
+
+    def memory_size(self):
+        return sys.getsizeof(self.columns) + sys.getsizeof(self)
+
+    def estimate_rows(self, column, operator, value):
+        column_stats = self.columns.get(column)
+        if column_stats is None or not self.row_count:
+            return self.row_count
+        if operator == "=":
+            return self.row_count / max(column_stats["distinct"], 1)
+
+        histogram = column_stats.get("histogram")
+        if not histogram or isinstance(value, bool) or not isinstance(value, int):
+            return self.row_count * RANGE_SELECTIVITY
+
+        below = estimate_fraction_below(histogram, value)
+        equal = estimate_fraction_equal(histogram, value, column_stats["distinct"])
+        if operator == "<":
+            fraction = below
+        elif operator == "<=":
+            fraction = below + equal
+        elif operator == ">":
+            fraction = 1 - below - equal
+        else:
+            fraction = 1 - below
+        return self.row_count * min(max(fraction, 0.0), 1.0)
+
+
+def build_histogram(sorted_values):
+    # Гистограмма равной глубины: в каждом интервале примерно одинаковое
+    # число значений, поэтому перекошенные распределения оцениваются точнее
+    bucket_size = -(-len(sorted_values) // HISTOGRAM_BUCKETS)
+    return [
+        [bucket[0], bucket[-1], len(bucket)]
+        for bucket in (
+            sorted_values[start:start + bucket_size]
+            for start in range(0, len(sorted_values), bucket_size)
+        )
+    ]
+
+
+def add_to_histogram(histogram, value):
+    position = bisect_right([bucket[0] for bucket in histogram], value) - 1
+    bucket = histogram[max(position, 0)]
+    bucket[0] = min(bucket[0], value)
+    bucket[1] = max(bucket[1], value)
+    bucket[2] += 1
+
+
+def estimate_fraction_below(histogram, value):
+    # Внутри интервала значения считаются распределенными равномерно
+    total = sum(bucket[2] for bucket in histogram)
+    if not total:
+        return 0.0
+
+    below = 0.0
+    for low, high, count in histogram:
+        if value > high:
+            below += count
+        elif value > low:
+            below += count * (value - low) / (high - low + 1)
+    return below / total
+
+
+def estimate_fraction_equal(histogram, value, distinct):
+    # Границы интервалов - значения, которые точно есть в столбце. Значение
+    # внутри интервала получает ту же равномерную долю, что и в
+    # estimate_fraction_below, а вне гистограммы не встречается вовсе
+    total = sum(bucket[2] for bucket in histogram)
+    equal = 1 / max(distinct, 1)
+    if not total:
+        return 0.0
+
+    for low, high, count in histogram:
+        if value == low or value == high:
+            return equal
+        if low < value < high:
+            return min(count / (high - low + 1) / total, equal)
+    return 0.0
@@ -0,0 +1,40 @@
+import os
+import re
+
+from .constants import (
+    DATA_DIR,
+    ERROR_INVALID_TABLE_NAME,
+    META_FILE,
+    TABLE_NAME_PATTERN,
+)
+from .errors import ValidationError
+
+TABLE_NAME_REGEX = re.compile(TABLE_NAME_PATTERN)
+
+# Пути к данным считаются от корня хранилища; по умолчанию это текущий
+# каталог, Database может открыть любой другой
+storage_root = {"path": ""}
+
+
+def set_storage_root(path):
+    storage_root["path"] = path or ""
+
+
+def get_data_dir():
+    return os.path.join(storage_root["path"], DATA_DIR)
+
+
+def get_meta_path():
+    return os.path.join(storage_root["path"], META_FILE)
+
+
+def check_table_name(table_name):
+    if not isinstance(table_name, str) or not TABLE_NAME_REGEX.fullmatch(table_name):
+        raise ValidationError(ERROR_INVALID_TABLE_NAME.format(table_name))
+
+
+def get_table_file_path(table_name, suffix):
+    # Все файлы таблицы лежат в каталоге данных: имя вроде "../x" не должно
+    # выводить путь за его пределы
+    check_table_name(table_name)
+    return os.path.join(get_data_dir(), f"{table_name}{suffix}")
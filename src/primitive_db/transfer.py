@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import csv
+import json
+import os
+
+from ..decorators import handle_db_errors, log_time
+from .constants import (
+    ERROR_TABLE_NOT_EXISTS,
+    LOG_INSERT,
+    TRANSFER_FORMATS,
+)
+from .core import convert_value, validate_value_type
+from .utils import (
+    get_cached_table_indexes,
+    in_transaction,
+    load_table_data,
+    next_table_id,
+    save_table_data,
+    write_table_changes,
+)
+
+
+def get_transfer_format(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in TRANSFER_FORMATS:
+        formats_str = ", ".join(TRANSFER_FORMATS)
+        msg = f'Ошибка: Неподдерживаемый формат файла "{file_path}".'
+        msg += f" Поддерживаемые форматы: {formats_str}."
+        print(msg)
+        return None
+    return extension
+
+
+def read_jsonl_rows(file):
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def convert_row(row, table_schema, columns, row_number):
+    new_record = {}
+    for column_name in columns:
+        if column_name not in row:
+            raise ValueError(
+                f'строка {row_number}: отсутствует столбец "{column_name}"'
+            )
+
+        value = str(row[column_name])
+        expected_type = table_schema[column_name]
+        if not validate_value_type(value, expected_type):
+            raise ValueError(
+                f'строка {row_number}: неверный тип для столбца "{column_name}".'
+                f" Ожидается {expected_type}."
+            )
+        new_record[column_name] = convert_value(value, expected_type)
+    return new_record
+
+
+@handle_db_errors
+@log_time
+def import_table(metadata, table_name, file_path):
+    if table_name not in metadata:
+        print(ERROR_TABLE_NOT_EXISTS.format(table_name))
+        return None
+
+    file_format = get_transfer_format(file_path)
+    if file_format is None:
+        return None
+
+    table_schema = metadata[table_name]
+    columns = list(table_schema.keys())[1:]
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        if file_format == ".csv":
+            rows = csv.DictReader(file)
+        else:
+            rows = read_jsonl_rows(file)
+
+        rows_values = [
+            convert_row(row, table_schema, columns, row_number)
+            for row_number, row in enumerate(rows, start=1)
+        ]
+
+    # ID выдаются одним диапазоном после проверки всего файла: ошибка в
+    # строке не должна оставлять пропуск в последовательности
+    first_id = next_table_id(table_name, len(rows_values))
+    new_records = [
+        {'ID': first_id + offset, **values}
+        for offset, values in enumerate(rows_values)
+    ]
+
+    table_data = load_table_data(table_name)
+    table_data.extend(new_records)
+    if in_transaction():
+        # Снимок нельзя переписать до фиксации - записи идут через журнал
+        entries = [{"op": LOG_INSERT, "row": record} for record in new_records]
+        write_table_changes(table_name, entries, get_cached_table_indexes(table_name))
+    else:
+        save_table_data(table_name, table_data)
+
+    print(f'Импортировано {len(new_records)} записей в таблицу "{table_name}".')
+    return new_records
+
+
+@handle_db_errors
+@log_time
+def export_table(metadata, table_name, file_path):
+    if table_name not in metadata:
+        print(ERROR_TABLE_NOT_EXISTS.format(table_name))
+        return None
+
+    file_format = get_transfer_format(file_path)
+    if file_format is None:
+        return None
+
+    columns = list(metadata[table_name].keys())
+    table_data = load_table_data(table_name)
+
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        if file_format == ".csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for record in table_data:
+                writer.writerow([record.get(column) for column in columns])
+        else:
+            for record in table_data:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    msg = f'Экспортировано {len(table_data)} записей'
+    msg += f' из таблицы "{table_name}" в файл "{file_path}".'
+    print(msg)
+    return len(table_data)
@@ -1,61 +1,938 @@
 #!/usr/bin/env python3
+import atexit
 import json
 import os
 import re
+import struct
+from contextlib import contextmanager
 
+from .cache import (
+    estimate_record_size,
+    estimate_rows_size,
+    get_file_signature,
+    table_cache,
+)
+from .codec import (
+    decode,
+    decode_rows,
+    encode,
+    encode_rows,
+    encode_text,
+    paused_gc,
+)
+from .columnar import ColumnarTable
 from .constants import (
     COLUMN_PATTERN,
-    DATA_DIR,
-    META_FILE,
+    COLUMNAR_EXTENSION,
+    GROUP_COMMIT_ENV,
+    INDEX_EXTENSION,
+    JOURNAL_EXTENSION,
+    JOURNAL_PREFIX,
+    JSON_COMPACT_ENV,
+    LOCK_WAIT_TIMEOUT,
+    LOG_COMPACTION_SIZE,
+    LOG_DELETE,
+    LOG_EXTENSION,
+    LOG_INSERT,
+    LOG_UPDATE,
+    PAGED_EXTENSION,
+    PRIMARY_KEY,
+    SEQUENCE_EXTENSION,
+    STATISTICS_KEY,
+    STATS_EXTENSION,
     SUPPORTED_TYPES,
+    TABLE_EXTENSION,
 )
+from .errors import CorruptedFileError, TransactionError, ValidationError
+from .index import ColumnIndex, PrimaryIndex
+from .locks import (
+    acquire_lock,
+    get_lock_path,
+    limit_lock_waits,
+    locked_table,
+    metadata_lock,
+    release_lock,
+    table_lock,
+)
+from .metrics import metrics
+from .pages import PagedTable, encode_paged_table
+from .stats import TableStatistics
+from .storage import get_data_dir, get_meta_path, get_table_file_path
+
+BINARY_TABLE_CLASSES = {"columnar": ColumnarTable, "paged": PagedTable}
+BINARY_STORAGE_FORMATS = list(BINARY_TABLE_CLASSES)
+COLUMN_DEFINITION_PATTERN = re.compile(COLUMN_PATTERN)
+
+
+def get_group_commit_size():
+    try:
+        return int(os.environ.get(GROUP_COMMIT_ENV, 0))
+    except ValueError:
+        return 0
+
+
+group_commit = {"size": get_group_commit_size(), "pending": 0, "tables": set()}
+json_snapshots = {"compact": os.environ.get(JSON_COMPACT_ENV, "1") != "0"}
+deferred_writes = {
+    "enabled": False,
+    "transaction": False,
+    "entries": {},
+    "sequences": {},
+    "locks": set(),
+}
+atexit.register(lambda: sync_pending_logs())
 
 
 def load_metadata():
+    meta_path = get_meta_path()
+    signature = get_file_signature(meta_path)
+    metadata = table_cache.get(("meta", meta_path), signature)
+    if metadata is not None:
+        return metadata
+
     try:
-        with open(META_FILE, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        with metadata_lock(), open(meta_path, 'r', encoding='utf-8') as file:
+            metadata = load_json_file(file)
     except FileNotFoundError:
-        return {}
-    except (json.JSONDecodeError, IOError):
-        return {}
+        metadata = {}
+    except json.JSONDecodeError as error:
+        raise CorruptedFileError(meta_path, error) from error
+
+    table_cache.put(
+        ("meta", meta_path), signature, metadata, estimate_record_size(metadata)
+    )
+    return metadata
 
 
 def save_metadata(data):
+    meta_path = get_meta_path()
     try:
-        with open(META_FILE, 'w', encoding='utf-8') as file:
+        with metadata_lock(exclusive=True), atomic_write(meta_path) as file:
             json.dump(data, file, indent=2, ensure_ascii=False)
+        table_cache.put(
+            ("meta", meta_path),
+            get_file_signature(meta_path),
+            data,
+            estimate_record_size(data),
+        )
         return True
     except IOError:
         return False
 
 
+def load_json_file(file):
+    metrics.add("bytes_read", os.fstat(file.fileno()).st_size)
+    with metrics.timer("parse_time"):
+        return decode(file.read())
+
+
+@contextmanager
+def atomic_write(file_path, mode='w'):
+    # Данные пишутся во временный файл и подменяют старый только после fsync,
+    # поэтому сбой посреди записи не оставляет обрезанный файл
+    temp_path = f"{file_path}.tmp"
+    encoding = None if 'b' in mode else 'utf-8'
+
+    try:
+        with open(temp_path, mode, encoding=encoding) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+            metrics.add("bytes_written", os.fstat(file.fileno()).st_size)
+        os.replace(temp_path, file_path)
+        sync_directory(os.path.dirname(file_path) or ".")
+    except BaseException:
+        remove_file(temp_path)
+        raise
+
+
+def sync_directory(directory):
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+def set_group_commit(size):
+    sync_pending_logs()
+    group_commit["size"] = max(size, 0)
+
+
+def commit_log_write(table_name, file):
+    if group_commit["size"] <= 1:
+        os.fsync(file.fileno())
+        return
+
+    group_commit["tables"].add(table_name)
+    group_commit["pending"] += 1
+    if group_commit["pending"] >= group_commit["size"]:
+        sync_pending_logs()
+
+
+def sync_pending_logs():
+    for table_name in group_commit["tables"]:
+        try:
+            log_fd = os.open(get_log_path(table_name), os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(log_fd)
+        finally:
+            os.close(log_fd)
+
+    group_commit["tables"].clear()
+    group_commit["pending"] = 0
+
+
+def get_table_path(table_name):
+    return get_table_file_path(table_name, TABLE_EXTENSION)
+
+
+def get_columnar_path(table_name):
+    return get_table_file_path(table_name, COLUMNAR_EXTENSION)
+
+
+def get_log_path(table_name):
+    return get_table_file_path(table_name, LOG_EXTENSION)
+
+
+def get_index_path(table_name, column):
+    return get_table_file_path(table_name, f".{column}{INDEX_EXTENSION}")
+
+
+def get_journal_path(pid=None):
+    # У каждого процесса свой журнал фиксации
+    pid = os.getpid() if pid is None else pid
+    return os.path.join(get_data_dir(), f"{JOURNAL_PREFIX}{pid}{JOURNAL_EXTENSION}")
+
+
+def list_journal_paths():
+    try:
+        file_names = os.listdir(get_data_dir())
+    except FileNotFoundError:
+        return []
+
+    return [
+        os.path.join(get_data_dir(), file_name)
+        for file_name in sorted(file_names)
+        if file_name.startswith(JOURNAL_PREFIX)
+        and file_name.endswith(JOURNAL_EXTENSION)
+    ]
+
+
+def get_stats_path(table_name):
+    return get_table_file_path(table_name, STATS_EXTENSION)
+
+
+def get_sequence_path(table_name):
+    return get_table_file_path(table_name, SEQUENCE_EXTENSION)
+
+
+def get_paged_path(table_name):
+    return get_table_file_path(table_name, PAGED_EXTENSION)
+
+
+def get_storage_paths(table_name):
+    return {
+        "json": get_table_path(table_name),
+        "columnar": get_columnar_path(table_name),
+        "paged": get_paged_path(table_name),
+    }
+
+
+def get_table_format(table_name):
+    for storage_format in BINARY_STORAGE_FORMATS:
+        if os.path.exists(get_storage_paths(table_name)[storage_format]):
+            return storage_format
+    return "json"
+
+
+def get_table_signature(table_name):
+    return get_file_signature(
+        *get_storage_paths(table_name).values(), get_log_path(table_name)
+    )
+
+
+def get_indexes_signature(table_name):
+    index_paths = [
+        get_index_path(table_name, column)
+        for column in list_index_columns(table_name)
+    ]
+    return get_file_signature(
+        get_log_path(table_name), get_stats_path(table_name), *index_paths
+    )
+
+
+@locked_table()
 def load_table_data(table_name):
-    file_path = os.path.join(DATA_DIR, f"{table_name}.json")
+    signature = get_table_signature(table_name)
+    table_data = table_cache.get(("table", table_name), signature)
+    if table_data is not None:
+        return table_data
+
+    table_data = replay_table_log(table_name, read_table_snapshot(table_name))
+    table_data = apply_log_entries(table_data, get_deferred_entries(table_name))
+    table_cache.put(
+        ("table", table_name), signature, table_data, estimate_rows_size(table_data)
+    )
+    return table_data
+
+
+def read_table_snapshot(table_name):
+    storage_format = get_table_format(table_name)
+    file_path = get_storage_paths(table_name)[storage_format]
+
+    if storage_format != "json":
+        try:
+            binary_table = BINARY_TABLE_CLASSES[storage_format].load(file_path)
+            metrics.add("bytes_read", len(binary_table.source))
+            with metrics.timer("parse_time"):
+                return binary_table.to_records()
+        except FileNotFoundError:
+            return []
+        except (ValueError, struct.error) as error:
+            raise CorruptedFileError(file_path, error) from error
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        with open(file_path, 'rb') as file, paused_gc():
+            return decode_rows(load_json_file(file))
     except FileNotFoundError:
         return []
-    except (json.JSONDecodeError, IOError):
+    except (json.JSONDecodeError, KeyError, TypeError) as error:
+        raise CorruptedFileError(file_path, error) from error
+
+
+@locked_table()
+def load_binary_table(table_name, storage_format):
+    # Журнал изменений к снимку не применяется: его накладывает
+    # load_table_changes при чтении
+    if get_table_format(table_name) != storage_format:
+        return None
+
+    file_path = get_storage_paths(table_name)[storage_format]
+    signature = get_file_signature(file_path)
+    binary_table = table_cache.get((storage_format, table_name), signature)
+    if binary_table is None:
+        try:
+            binary_table = BINARY_TABLE_CLASSES[storage_format].load(file_path)
+        except (ValueError, struct.error) as error:
+            raise CorruptedFileError(file_path, error) from error
+        metrics.add("bytes_read", len(binary_table.source))
+        table_cache.put(
+            (storage_format, table_name),
+            signature,
+            binary_table,
+            binary_table.memory_size(),
+        )
+    return binary_table
+
+
+def load_columnar_table(table_name):
+    return load_binary_table(table_name, "columnar")
+
+
+def load_paged_table(table_name):
+    return load_binary_table(table_name, "paged")
+
+
+def get_cached_table_data(table_name):
+    return table_cache.get(("table", table_name), get_table_signature(table_name))
+
+
+def get_cached_table_indexes(table_name):
+    return table_cache.get(("indexes", table_name), get_indexes_signature(table_name))
+
+
+@locked_table(exclusive=True)
+def save_table_data(table_name, data, storage_format=None):
+    storage_paths = get_storage_paths(table_name)
+    storage_format = storage_format or get_table_format(table_name)
+    file_path = storage_paths[storage_format]
+
+    try:
+        os.makedirs(get_data_dir(), exist_ok=True)
+        if storage_format == "json":
+            content = encode_json_table(table_name, data)
+        else:
+            table_schema = load_metadata()[table_name]
+            content = encode_binary_table(storage_format, table_schema, data)
+        pending_id = deferred_writes["sequences"].get(table_name)
+        if pending_id is not None:
+            # Снимок содержит строки с ID, выданными пакетом: если процесс
+            # упадет до фиксации, следующая вставка не должна их перезаписать
+            write_table_sequence(table_name, pending_id)
+        with atomic_write(file_path, 'wb') as file:
+            file.write(content)
+        for other_format, other_path in storage_paths.items():
+            if other_format != storage_format:
+                remove_file(other_path)
+        rebuild_table_indexes(table_name, data)
+        remove_table_log(table_name)
+        # Отложенные изменения уже содержатся в записанном снимке
+        deferred_writes["entries"].pop(table_name, None)
+        table_cache.invalidate(("indexes", table_name))
+        table_cache.put(
+            ("table", table_name),
+            get_table_signature(table_name),
+            data,
+            estimate_rows_size(data),
+        )
+        return True
+    except IOError:
+        # Вызывающий код мог уже изменить кэшированный список на месте
+        discard_cached_table(table_name)
+        return False
+
+
+def encode_json_table(table_name, data):
+    if not json_snapshots["compact"]:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+    # Порядок столбцов берется из схемы; таблица, еще не записанная
+    # в метаданные (create_table), берет его из первой строки
+    table_schema = load_metadata().get(table_name)
+    if table_schema is not None:
+        columns = list(table_schema)
+    else:
+        columns = list(data[0]) if data else []
+    return encode_rows(columns, data)
+
+
+def set_compact_json(enabled):
+    json_snapshots["compact"] = enabled
+
+
+def encode_binary_table(storage_format, table_schema, data):
+    # Строки, записанные до проверки диапазона целых, могут не поместиться
+    # в int64 двоичного формата
+    try:
+        if storage_format == "columnar":
+            return ColumnarTable.from_records(table_schema, data).to_bytes()
+        return encode_paged_table(table_schema, data)
+    except (struct.error, OverflowError, TypeError) as error:
+        msg = f'значение не помещается в формат "{storage_format}" ({error})'
+        raise ValidationError(msg) from error
+
+
+def append_table_log(table_name, entries):
+    if is_deferred():
+        hold_table_lock(table_name)
+        deferred_writes["entries"].setdefault(table_name, []).extend(entries)
+        return True
+    return write_table_log(table_name, entries)
+
+
+@locked_table(exclusive=True)
+def write_table_log(table_name, entries):
+    # Записи уже применены к списку из load_table_data и к индексам из
+    # load_table_indexes, поэтому кэш остается актуальным - достаточно
+    # обновить сигнатуры файлов
+    log_path = get_log_path(table_name)
+    old_signature = get_table_signature(table_name)
+    old_indexes_signature = get_indexes_signature(table_name)
+
+    try:
+        os.makedirs(get_data_dir(), exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as file:
+            start = file.tell()
+            file.write(encode_log_entries(entries))
+            file.flush()
+            commit_log_write(table_name, file)
+            metrics.add("bytes_written", file.tell() - start)
+        table_cache.refresh(
+            ("table", table_name), old_signature, get_table_signature(table_name)
+        )
+        table_cache.refresh(
+            ("indexes", table_name),
+            old_indexes_signature,
+            get_indexes_signature(table_name),
+        )
+        if os.path.getsize(log_path) > LOG_COMPACTION_SIZE:
+            # Изменения уже в журнале: если сжатие не удалось, журнал
+            # остается на месте и будет сжат при следующей записи
+            compact_table(table_name)
+        return True
+    except IOError:
+        return False
+
+
+def encode_log_entries(entries):
+    return "".join(encode_text(entry) + "\n" for entry in entries)
+
+
+def get_log_size(table_name):
+    try:
+        return os.path.getsize(get_log_path(table_name))
+    except FileNotFoundError:
+        return 0
+
+
+def read_table_log(table_name):
+    log_path = get_log_path(table_name)
+
+    try:
+        with open(log_path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+            metrics.add("bytes_read", os.fstat(file.fileno()).st_size)
+    except FileNotFoundError:
         return []
 
+    entries = []
+    with metrics.timer("parse_time"):
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                entries.append(decode(line))
+            except json.JSONDecodeError as error:
+                if line_number == len(lines):
+                    # Недописанная последняя строка после сбоя - запись
+                    # не состоялась
+                    break
+                raise CorruptedFileError(log_path, error) from error
+    return entries
+
+
+@locked_table()
+def load_table_changes(table_name):
+    # Изменения из журнала, еще не свернутого в снимок: ID -> новая строка
+    # или None для удаленной. Журнал ограничен LOG_COMPACTION_SIZE, поэтому
+    # словарь невелик по сравнению с таблицей
+    signature = get_file_signature(get_log_path(table_name))
+    changes = table_cache.get(("changes", table_name), signature)
+    if changes is None:
+        changes = collect_log_changes(read_table_log(table_name), {})
+        table_cache.put(
+            ("changes", table_name),
+            signature,
+            changes,
+            estimate_rows_size([row for row in changes.values() if row]),
+        )
+
+    deferred_entries = get_deferred_entries(table_name)
+    if deferred_entries:
+        changes = collect_log_changes(deferred_entries, dict(changes))
+    return changes
+
+
+def collect_log_changes(entries, changes):
+    for entry in entries:
+        if entry.get("op") == LOG_DELETE:
+            changes[entry["id"]] = None
+        else:
+            changes[entry["row"]["ID"]] = entry["row"]
+    return changes
+
+
+def replay_table_log(table_name, table_data):
+    return apply_log_entries(table_data, read_table_log(table_name))
+
+
+def apply_log_entries(table_data, entries):
+    if not entries:
+        return table_data
+
+    positions = {record['ID']: index for index, record in enumerate(table_data)}
+    has_deletes = False
+
+    for entry in entries:
+        operation = entry.get("op")
+        if operation == LOG_INSERT and entry["row"]["ID"] not in positions:
+            positions[entry["row"]["ID"]] = len(table_data)
+            table_data.append(entry["row"])
+        elif operation in (LOG_INSERT, LOG_UPDATE):
+            # Повторная вставка возможна, если сбой случился после записи
+            # снимка, но до удаления журнала
+            position = positions.get(entry["row"]["ID"])
+            if position is not None:
+                table_data[position] = entry["row"]
+        elif operation == LOG_DELETE:
+            position = positions.pop(entry["id"], None)
+            if position is not None:
+                table_data[position] = None
+                has_deletes = True
+
+    if has_deletes:
+        table_data = [record for record in table_data if record is not None]
+
+    return table_data
 
-def save_table_data(table_name, data):
-    file_path = os.path.join(DATA_DIR, f"{table_name}.json")
 
+def compact_table(table_name):
+    return save_table_data(table_name, load_table_data(table_name))
+
+
+def remove_table_log(table_name):
+    remove_file(get_log_path(table_name))
+
+
+def remove_file(file_path):
     try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2, ensure_ascii=False)
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def write_table_changes(table_name, entries, indexes=None):
+    # Строки и индексы из кэша меняются до записи журнала: если запись не
+    # удалась, они перечитываются с диска
+    try:
+        for index in (indexes or {}).values():
+            for entry in entries:
+                index.apply_log_entry(entry)
+        written = append_table_log(table_name, entries)
+    except BaseException:
+        discard_cached_table(table_name)
+        raise
+    if not written:
+        discard_cached_table(table_name)
+    return written
+
+
+def discard_cached_table(table_name):
+    table_cache.invalidate(("table", table_name))
+    table_cache.invalidate(("indexes", table_name))
+
+
+def list_index_columns(table_name):
+    prefix = f"{table_name}."
+    try:
+        file_names = os.listdir(get_data_dir())
+    except FileNotFoundError:
+        return []
+
+    columns = []
+    for file_name in sorted(file_names):
+        if file_name.startswith(prefix) and file_name.endswith(INDEX_EXTENSION):
+            column = file_name[len(prefix):-len(INDEX_EXTENSION)]
+            if column and "." not in column:
+                columns.append(column)
+    return columns
+
+
+@locked_table()
+def load_table_indexes(table_name):
+    signature = get_indexes_signature(table_name)
+    indexes = table_cache.get(("indexes", table_name), signature)
+    if indexes is not None:
+        return indexes
+
+    indexes = {}
+    for column in list_index_columns(table_name):
+        index_path = get_index_path(table_name, column)
+        try:
+            with open(index_path, 'rb') as file:
+                indexes[column] = ColumnIndex.from_dict(load_json_file(file))
+        except (json.JSONDecodeError, IOError, KeyError):
+            continue
+
+    # Статистика хранится рядом с индексами и так же догоняет журнал
+    statistics = load_table_statistics(table_name)
+    if statistics is not None:
+        indexes[STATISTICS_KEY] = statistics
+
+    if indexes:
+        entries = read_table_log(table_name) + get_deferred_entries(table_name)
+        for index in indexes.values():
+            for entry in entries:
+                index.apply_log_entry(entry)
+
+    indexes[PRIMARY_KEY] = PrimaryIndex(load_table_data(table_name))
+    indexes_size = sum(index.memory_size() for index in indexes.values())
+    table_cache.put(("indexes", table_name), signature, indexes, indexes_size)
+    return indexes
+
+
+@locked_table(exclusive=True)
+def save_table_index(table_name, index):
+    index_path = get_index_path(table_name, index.column)
+
+    try:
+        os.makedirs(get_data_dir(), exist_ok=True)
+        with atomic_write(index_path, 'wb') as file:
+            file.write(encode(index.to_dict()))
+        table_cache.invalidate(("indexes", table_name))
         return True
     except IOError:
         return False
 
 
+def load_table_statistics(table_name):
+    try:
+        with open(get_stats_path(table_name), 'r', encoding='utf-8') as file:
+            return TableStatistics.from_dict(load_json_file(file))
+    except (json.JSONDecodeError, IOError, KeyError):
+        return None
+
+
+@locked_table(exclusive=True)
+def save_table_statistics(table_name, statistics):
+    try:
+        os.makedirs(get_data_dir(), exist_ok=True)
+        with atomic_write(get_stats_path(table_name)) as file:
+            json.dump(statistics.to_dict(), file, ensure_ascii=False)
+        table_cache.invalidate(("indexes", table_name))
+        return True
+    except IOError:
+        return False
+
+
+def rebuild_table_indexes(table_name, data):
+    table_schema = load_metadata().get(table_name, {})
+    if table_schema:
+        statistics = TableStatistics.build(table_schema, data)
+        save_table_statistics(table_name, statistics)
+
+    for column in list_index_columns(table_name):
+        if column in table_schema:
+            index = ColumnIndex.build(column, table_schema[column], data)
+            save_table_index(table_name, index)
+
+
+@locked_table(exclusive=True)
+def remove_table_indexes(table_name):
+    table_cache.invalidate(("indexes", table_name))
+    remove_file(get_stats_path(table_name))
+    for column in list_index_columns(table_name):
+        remove_file(get_index_path(table_name, column))
+
+
+@locked_table(exclusive=True)
+def next_table_id(table_name, count=1):
+    if is_deferred():
+        hold_table_lock(table_name)
+        sequences = deferred_writes["sequences"]
+        if table_name not in sequences:
+            sequences[table_name] = read_table_sequence(table_name)
+        sequences[table_name] += count
+        return sequences[table_name] - count + 1
+
+    last_id = read_table_sequence(table_name)
+    write_table_sequence(table_name, last_id + count)
+    return last_id + 1
+
+
+def read_table_sequence(table_name):
+    try:
+        with open(get_sequence_path(table_name), 'r', encoding='utf-8') as file:
+            return int(file.read().strip())
+    except (FileNotFoundError, ValueError):
+        # Первое обращение: продолжаем нумерацию существующих записей
+        table_data = load_table_data(table_name)
+        return max((record['ID'] for record in table_data), default=0)
+
+
+def write_table_sequence(table_name, last_id):
+    os.makedirs(get_data_dir(), exist_ok=True)
+    with atomic_write(get_sequence_path(table_name)) as file:
+        file.write(str(last_id))
+
+
+def reset_table_sequence(table_name):
+    deferred_writes["sequences"].pop(table_name, None)
+    try:
+        os.remove(get_sequence_path(table_name))
+    except FileNotFoundError:
+        pass
+
+
+def get_deferred_entries(table_name):
+    return deferred_writes["entries"].get(table_name, [])
+
+
+def count_deferred_entries():
+    return sum(len(entries) for entries in deferred_writes["entries"].values())
+
+
+def is_deferred():
+    return deferred_writes["enabled"] or deferred_writes["transaction"]
+
+
+def in_transaction():
+    return deferred_writes["transaction"]
+
+
+def set_deferred_writes(enabled):
+    flush_deferred_writes()
+    deferred_writes["enabled"] = enabled
+
+
+def begin_transaction():
+    # Изменения пакета, сделанные до BEGIN, не должны откатываться вместе
+    # с транзакцией
+    flush_deferred_writes()
+    deferred_writes["transaction"] = True
+
+
+def commit_transaction():
+    deferred_writes["transaction"] = False
+    return flush_deferred_writes()
+
+
+def rollback_transaction():
+    entries = take_deferred_writes()[1]
+    for table_name in deferred_writes["locks"]:
+        # Кэшированные строки и индексы уже изменены на месте
+        discard_cached_table(table_name)
+    release_table_locks()
+    deferred_writes["transaction"] = False
+    return sum(len(table_entries) for table_entries in entries.values())
+
+
+def take_deferred_writes():
+    sequences = deferred_writes["sequences"]
+    entries = deferred_writes["entries"]
+    deferred_writes["sequences"] = {}
+    deferred_writes["entries"] = {}
+    return sequences, entries
+
+
+def flush_deferred_writes():
+    # Изменения копятся в памяти и уходят на диск одной дозаписью журнала
+    # на таблицу. Сначала все изменения попадают в журнал фиксации: если
+    # процесс упадет посреди записи, recover_transaction допишет остальное
+    sequences = deferred_writes["sequences"]
+    entries = deferred_writes["entries"]
+    if not sequences and not entries:
+        release_table_locks()
+        return 0
+
+    journal_path = get_journal_path()
+    try:
+        # Прерванная прошлая фиксация этого процесса дописывается раньше,
+        # чем ее журнал будет перезаписан
+        recover_journal(journal_path)
+        journal = {
+            "sequences": sequences,
+            "logs": {
+                table_name: {
+                    "offset": get_log_size(table_name),
+                    "text": encode_log_entries(table_entries),
+                }
+                for table_name, table_entries in entries.items()
+            },
+        }
+        os.makedirs(get_data_dir(), exist_ok=True)
+        with atomic_write(journal_path) as file:
+            json.dump(journal, file, ensure_ascii=False)
+    except (OSError, TypeError, ValueError) as error:
+        # Изменения остаются в памяти, их запишет следующая фиксация
+        msg = f"Ошибка: Не удалось записать изменения на диск - {error}."
+        msg += " Изменения сохранены в памяти."
+        raise TransactionError(msg) from error
+
+    take_deferred_writes()
+    try:
+        for table_name, last_id in sequences.items():
+            write_table_sequence(table_name, last_id)
+        written = [
+            write_table_log(table_name, table_entries)
+            for table_name, table_entries in entries.items()
+        ]
+        sync_pending_logs()
+        if not all(written):
+            raise OSError("журнал таблицы не записан")
+        remove_file(journal_path)
+    except OSError as error:
+        msg = f"Ошибка: Не удалось записать изменения на диск - {error}."
+        msg += " Они будут дописаны из журнала фиксации при следующей записи"
+        msg += " или запуске."
+        raise TransactionError(msg) from error
+    finally:
+        release_table_locks()
+    return sum(len(table_entries) for table_entries in entries.values())
+
+
+def recover_transactions():
+    return sum(
+        recover_journal(journal_path) for journal_path in list_journal_paths()
+    )
+
+
+def recover_journal(journal_path):
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as file:
+            journal = json.load(file)
+    except FileNotFoundError:
+        return False
+    except json.JSONDecodeError as error:
+        raise CorruptedFileError(journal_path, error) from error
+
+    # Если владелец журнала еще фиксирует транзакцию, он держит
+    # блокировки таблиц - после их освобождения изменения уже в журналах
+    # таблиц, и recover_table_log ничего не допишет
+    for table_name, last_id in journal["sequences"].items():
+        with table_lock(table_name, exclusive=True):
+            if read_table_sequence(table_name) < last_id:
+                write_table_sequence(table_name, last_id)
+    for table_name, log in journal["logs"].items():
+        with table_lock(table_name, exclusive=True):
+            recover_table_log(table_name, log["offset"], log["text"])
+
+    remove_file(journal_path)
+    return True
+
+
+def recover_table_log(table_name, offset, text):
+    log_path = get_log_path(table_name)
+    text = text.encode('utf-8')
+    if get_log_size(table_name) < offset:
+        # Журнал уже свернут в снимок - изменения в нем
+        return
+
+    with open(log_path, 'ab+') as file:
+        file.seek(offset)
+        written = file.read(len(text))
+        if written == text or not text.startswith(written):
+            # Изменения уже записаны, либо журнал с тех пор переписан
+            return
+        file.truncate(offset)
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def hold_table_lock(table_name):
+    # Пакет удерживает блокировку записи до фиксации, иначе другой процесс
+    # выдал бы те же ID или дописал журнал в обход отложенных изменений
+    if table_name not in deferred_writes["locks"]:
+        acquire_lock(get_lock_path(table_name), exclusive=True)
+        deferred_writes["locks"].add(table_name)
+        # Держа блокировку, процесс не должен ждать другую бесконечно: два
+        # пакета, захватившие таблицы в разном порядке, ждали бы друг друга
+        limit_lock_waits(LOCK_WAIT_TIMEOUT, abort_deferred_writes)
+
+
+def abort_deferred_writes(lock_path):
+    limit_lock_waits(None)
+    lock_name = os.path.splitext(os.path.basename(lock_path))[0]
+    msg = f'Ошибка: Блокировка "{lock_name}" занята другим процессом'
+    msg += f" дольше {LOCK_WAIT_TIMEOUT:g} с."
+    if in_transaction():
+        rollback_transaction()
+        msg += " Транзакция отменена."
+    else:
+        # Пакет не атомарен: накопленные изменения записываются, и другой
+        # процесс получает освободившиеся блокировки
+        flush_deferred_writes()
+        msg += " Предыдущие изменения записаны, команда не выполнена."
+    raise TransactionError(msg)
+
+
+def release_table_locks():
+    limit_lock_waits(None)
+    for table_name in deferred_writes["locks"]:
+        release_lock(get_lock_path(table_name))
+    deferred_writes["locks"] = set()
+
+
 def validate_column_definition(column_definition):
-    return bool(re.match(COLUMN_PATTERN, column_definition))
+    return COLUMN_DEFINITION_PATTERN.match(column_definition) is not None
 
 
 def validate_data_type(data_type):